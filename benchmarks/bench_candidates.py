@@ -0,0 +1,72 @@
+"""
+Tail latency of the assistant's answer strategies.
+
+Runs the same questions through query_with_retry with the sequential
+strategy (draft -> correction -> retries) and the parallel one (race k
+candidates, first acceptable wins), and prints p50/p95/p99 per strategy.
+Point OLLAMA_BASE_URL at a real or fake Ollama before running:
+
+    OLLAMA_BASE_URL=http://127.0.0.1:11500 python -m benchmarks.bench_candidates --runs 50
+"""
+import argparse
+import json
+import time
+
+import components.Assistant as Assistant
+from benchmarks.stats import summarize
+
+QUESTIONS = [
+    "what is organic farming",
+    "how to control pests in rice",
+    "best fertilizer for wheat",
+    "how much water does sugarcane need",
+    "how to treat lumpy skin disease in cows",
+]
+
+
+class _NoAnswerCache:
+    """Every question must reach the model, or the strategies can't be compared."""
+
+    def get(self, *args, **kwargs):
+        return None
+
+    def put(self, *args, **kwargs):
+        pass
+
+
+def bypass_instant_answers():
+    """
+    Send every question to the model: no answer cache and no knowledge-index
+    direct answers, which would otherwise answer several QUESTIONS instantly.
+    """
+    Assistant.answer_cache = _NoAnswerCache()
+    Assistant.instant_answer = lambda user_input, dest_lang="en", hits=None, follow_up=False: None
+
+
+def run_strategy(strategy, runs, lang="en"):
+    latencies, fallbacks = [], 0
+    for i in range(runs):
+        question = QUESTIONS[i % len(QUESTIONS)]
+        start = time.perf_counter()
+        answer = Assistant.query_with_retry(question, lang, strategy=strategy)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if answer == Assistant.fallback_answer(question, lang):
+            fallbacks += 1
+    report = summarize(latencies)
+    report["fallbacks"] = fallbacks
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sequential vs parallel answer strategies.")
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--strategies", nargs="+", default=["sequential", "parallel"])
+    args = parser.parse_args()
+
+    bypass_instant_answers()
+    results = {strategy: run_strategy(strategy, args.runs) for strategy in args.strategies}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+add_record / get_records throughput under concurrent load.
+
+Compares db.py's per-thread WAL connections ("pooled") with the previous
+pattern of opening, committing and closing a rollback-journal connection
+on every call ("legacy"). Each mode runs on a fresh scratch database with
+the same mix of writer and reader threads.
+
+    python -m benchmarks.bench_db --writers 4 --readers 4 --seconds 5
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+from benchmarks.stats import summarize
+
+SEED_ROWS = 1000
+
+
+class LegacyDB:
+    """The pre-connection-manager db.py calls, kept for comparison."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def add_record(self, record_type, detail, date):
+        conn = sqlite3.connect(self.path)
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO records (record_type, detail, date) VALUES (?, ?, ?)",
+                       (record_type, detail, date))
+        conn.commit()
+        conn.close()
+
+    def get_records(self):
+        conn = sqlite3.connect(self.path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM records ORDER BY id DESC")
+        records = cursor.fetchall()
+        conn.close()
+        return records
+
+
+def _prepare(path, wal):
+    conn = sqlite3.connect(path)
+    if wal:
+        conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE records (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            record_type TEXT NOT NULL,
+            detail TEXT NOT NULL,
+            date TEXT NOT NULL
+        )
+    """)
+    conn.executemany("INSERT INTO records (record_type, detail, date) VALUES (?, ?, ?)",
+                     [("Crop", f"seed row {i}", "2025-07-17") for i in range(SEED_ROWS)])
+    conn.commit()
+    conn.close()
+
+
+def run_mode(mode, writers, readers, seconds):
+    scratch = tempfile.mkdtemp(prefix="farmin-bench-db-")
+    path = os.path.join(scratch, "farmer_data.db")
+    _prepare(path, wal=mode == "pooled")
+    if mode == "pooled":
+        import db
+        db.DB_NAME = path
+        api = db
+    else:
+        api = LegacyDB(path)
+
+    lock = threading.Lock()
+    latencies = {"add_record": [], "get_records": []}
+    errors = {"add_record": 0, "get_records": 0}
+    rows_read = [0]
+    deadline = time.monotonic() + seconds
+
+    def worker(op, index):
+        local, failed, rows = [], 0, 0
+        n = 0
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                if op == "add_record":
+                    api.add_record("Dairy", f"writer {index} row {n}", "2025-07-17")
+                else:
+                    rows += len(api.get_records())
+            except sqlite3.OperationalError:
+                failed += 1   # "database is locked"
+            else:
+                local.append((time.perf_counter() - start) * 1000)
+            n += 1
+        if mode == "pooled":
+            db.close_connection()
+        with lock:
+            latencies[op].extend(local)
+            errors[op] += failed
+            rows_read[0] += rows
+
+    threads = [threading.Thread(target=worker, args=("add_record", i)) for i in range(writers)]
+    threads += [threading.Thread(target=worker, args=("get_records", i)) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    shutil.rmtree(scratch, ignore_errors=True)
+
+    report = {"mode": mode}
+    for op in latencies:
+        stats = summarize(latencies[op])
+        stats["ops_per_s"] = round(len(latencies[op]) / seconds, 1)
+        stats["locked_errors"] = errors[op]
+        report[op] = stats
+    # Faster writers grow the table faster, so compare reads by rows too
+    report["get_records"]["rows_per_s"] = round(rows_read[0] / seconds)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark db.py under concurrent readers and writers.")
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--modes", nargs="+", choices=["legacy", "pooled"], default=["legacy", "pooled"])
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory(prefix="farmin-bench-db-") as scratch:
+        # Importing db creates its tables, so point it away from farmer_data.db first
+        os.environ["FARMIN_DB"] = os.path.join(scratch, "farmer_data.db")
+        os.environ["FARMIN_IMAGE_STORE"] = os.path.join(scratch, "image_store")
+        reports = [run_mode(mode, args.writers, args.readers, args.seconds) for mode in args.modes]
+    print(json.dumps(reports, indent=2))
+
+
+if __name__ == "__main__":
+    main()
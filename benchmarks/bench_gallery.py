@@ -0,0 +1,85 @@
+"""
+Gallery page weight with and without thumbnails.
+
+Stores N camera-sized JPEGs through db.insert_image_bytes, then compares
+the bytes one gallery page hands to st.image (which Streamlit also keeps
+in memory for the session) when it shows originals versus the WebP
+thumbnails. Also times ingest and the thumbnail backfill.
+
+    python -m benchmarks.bench_gallery --images 24 --width 4000 --height 3000
+"""
+import argparse
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from benchmarks.stats import summarize
+
+
+def photo_jpeg(seed, width, height):
+    """Smooth gradients plus sensor-like noise, so JPEG sizes resemble real photos."""
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width]
+    base = np.stack([(x * (i + 1) / width + y / height) * 90 % 255 for i in range(3)], axis=-1)
+    pixels = np.clip(base + rng.normal(0, 12, base.shape), 0, 255).astype(np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark gallery page weight with thumbnails.")
+    parser.add_argument("--images", type=int, default=24)
+    parser.add_argument("--width", type=int, default=4000)
+    parser.add_argument("--height", type=int, default=3000)
+    parser.add_argument("--page-size", type=int, default=None, help="images per gallery page (default: db.IMAGES_PAGE_SIZE)")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="farmin-bench-gallery-")
+    try:
+        # Importing db creates its tables, so point it away from farmer_data.db first
+        os.environ["FARMIN_DB"] = os.path.join(scratch, "farmer_data.db")
+        os.environ["FARMIN_IMAGE_STORE"] = os.path.join(scratch, "image_store")
+        import db
+
+        photos = [photo_jpeg(i, args.width, args.height) for i in range(args.images)]
+
+        ingest = []
+        for i, data in enumerate(photos):
+            start = time.perf_counter()
+            db.insert_image_bytes(f"leaf {i}", "crop", "blight", data)
+            ingest.append((time.perf_counter() - start) * 1000)
+
+        page, _ = db.query_images(limit=args.page_size or db.IMAGES_PAGE_SIZE)
+        original_bytes = sum(os.path.getsize(img[4]) for img in page)
+        thumbnail_bytes = sum(os.path.getsize(img[5]) for img in page if img[5])
+
+        shutil.rmtree(os.path.join(db.image_store.root, "thumbs"))
+        start = time.perf_counter()
+        made = db.backfill_thumbnails()
+        backfill_s = time.perf_counter() - start
+        db.close_connection()
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    print(json.dumps({
+        "images": args.images,
+        "photo": f"{args.width}x{args.height}",
+        "page_images": len(page),
+        "page_kb_originals": round(original_bytes / 1024),
+        "page_kb_thumbnails": round(thumbnail_bytes / 1024),
+        "reduction": round(original_bytes / thumbnail_bytes, 1) if thumbnail_bytes else None,
+        "insert_image_bytes": summarize(ingest),
+        "backfill_s": round(backfill_s, 2),
+        "backfilled": made,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
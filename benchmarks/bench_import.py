@@ -0,0 +1,104 @@
+"""
+Bulk import and streaming export of records.
+
+Import: N ledger rows through add_record (one transaction each) versus
+records_io.import_file (executemany in one transaction). Export: peak
+Python memory of get_records() + csv versus records_io.export_chunks.
+
+    python -m benchmarks.bench_import --rows 50000
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+
+def ledger_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["record_type", "detail", "date"])
+    for i in range(rows):
+        writer.writerow([("Dairy", "Poultry", "Crop")[i % 3], f"ledger entry {i}", f"2024-{i % 12 + 1:02d}-15"])
+    return buffer.getvalue()
+
+
+def fresh_db(scratch, name):
+    import db
+
+    db.DB_NAME = os.path.join(scratch, name)
+    db.create_table()
+
+
+def bench_import(scratch, data, rows, add_record_limit):
+    import db
+    import records_io
+
+    fresh_db(scratch, "one_by_one.db")
+    n = min(rows, add_record_limit)
+    start = time.perf_counter()
+    for _, row in zip(range(n), records_io.read_rows(io.StringIO(data), "csv")):
+        db.add_record(*records_io.validate_record(row[1]))
+    per_row = (time.perf_counter() - start) / n
+
+    fresh_db(scratch, "bulk.db")
+    start = time.perf_counter()
+    result = records_io.import_file(io.StringIO(data), "csv")
+    bulk = time.perf_counter() - start
+    return {
+        "rows": rows,
+        "add_record_rows_per_s": round(1 / per_row),
+        "add_record_est_s": round(per_row * rows, 2),
+        "bulk_import_s": round(bulk, 3),
+        "bulk_rows_per_s": round(result.imported / bulk),
+    }
+
+
+def peak_kb(fn):
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return round(peak / 1024)
+
+
+def bench_export():
+    import db
+    import records_io
+
+    def fetchall_export():
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(db.get_records())
+        return len(buffer.getvalue())
+
+    def chunked_export():
+        return sum(len(chunk) for chunk in records_io.export_chunks("records", "csv"))
+
+    return {"fetchall_peak_kb": peak_kb(fetchall_export), "chunked_peak_kb": peak_kb(chunked_export)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bulk record import and streaming export.")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--add-record-limit", type=int, default=5000,
+                        help="time add_record on at most this many rows and extrapolate")
+    args = parser.parse_args()
+
+    data = ledger_csv(args.rows)
+    with tempfile.TemporaryDirectory(prefix="farmin-bench-import-") as scratch:
+        # Importing db creates its tables, so point it away from farmer_data.db first
+        os.environ["FARMIN_DB"] = os.path.join(scratch, "farmer_data.db")
+        os.environ["FARMIN_IMAGE_STORE"] = os.path.join(scratch, "image_store")
+        import db
+
+        report = bench_import(scratch, data, args.rows, args.add_record_limit)
+        report.update(bench_export())
+        db.close_connection()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Record query latency as the records table grows.
+
+Fills a scratch database to each size, then times a page of
+query_records at the start and in the middle of the table, with and
+without filters, next to the unpaginated get_records.
+
+    python -m benchmarks.bench_records --sizes 10000 100000 1000000
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.stats import summarize
+
+RECORD_TYPES = ["Dairy", "Poultry", "Crop"]
+START_DATE = datetime.date(2015, 1, 1)
+
+
+def fill(target, rng, batch=50000):
+    import db
+
+    have = db.get_connection().execute("SELECT COUNT(*) FROM records").fetchone()[0]
+    while have < target:
+        n = min(batch, target - have)
+        rows = [
+            (rng.choice(RECORD_TYPES), f"note {have + i}",
+             (START_DATE + datetime.timedelta(days=rng.randrange(3650))).isoformat())
+            for i in range(n)
+        ]
+        with db.transaction() as conn:
+            conn.executemany("INSERT INTO records (record_type, detail, date) VALUES (?, ?, ?)", rows)
+        have += n
+
+
+def timed(fn, runs):
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return summarize(latencies)
+
+
+def bench_size(size, rng, runs, full_scan_limit):
+    import db
+
+    fill(size, rng)
+    middle = db.get_connection().execute(
+        "SELECT date, id FROM records ORDER BY date DESC, id DESC LIMIT 1 OFFSET ?", (size // 2,)
+    ).fetchone()
+    result = {
+        "rows": size,
+        "first_page": timed(lambda: db.query_records(), runs),
+        "middle_page": timed(lambda: db.query_records(after=middle), runs),
+        "middle_page_prev": timed(lambda: db.query_records(before=middle), runs),
+        "type_and_range": timed(lambda: db.query_records(record_type="Crop", date_from="2018-01-01",
+                                                         date_to="2020-12-31", after=middle), runs),
+    }
+    if size <= full_scan_limit:
+        result["get_records_all"] = timed(db.get_records, max(1, runs // 10))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark paginated record queries by table size.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--full-scan-limit", type=int, default=100000,
+                        help="only time get_records up to this many rows")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory(prefix="farmin-bench-records-") as scratch:
+        # Importing db creates its tables, so point it away from farmer_data.db first
+        os.environ["FARMIN_DB"] = os.path.join(scratch, "farmer_data.db")
+        os.environ["FARMIN_IMAGE_STORE"] = os.path.join(scratch, "image_store")
+        import db
+
+        results = [bench_size(size, rng, args.runs, args.full_scan_limit) for size in sorted(args.sizes)]
+        db.close_connection()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Build and query cost of the BM25 knowledge index on synthetic corpora.
+
+    python -m benchmarks.bench_retrieval --sizes 1000 10000 100000 --queries 500
+"""
+import argparse
+import json
+import random
+import time
+
+from benchmarks.stats import summarize
+from components.knowledge_index import BM25Index
+
+WORDS = (
+    "rice wheat maize cotton sugarcane soil loam clay sandy irrigation drip sprinkler pest aphid "
+    "borer fungus blight rust nitrogen phosphorus potassium urea compost manure mulch seed sowing "
+    "harvest yield rainfall monsoon summer winter poultry cattle dairy fodder vaccine disease "
+    "organic rotation tillage weed herbicide pesticide spray market price profit investment acre"
+).split()
+
+
+def synthetic_passages(n, words_per_passage=40, seed=7):
+    rng = random.Random(seed)
+    # Zipf-like skew so some terms are common and others rare, as in real text
+    weights = [1.0 / (rank + 1) for rank in range(len(WORDS))]
+    for i in range(n):
+        yield f"doc{i}", " ".join(rng.choices(WORDS, weights, k=words_per_passage))
+
+
+def bench_size(n, queries, k=3):
+    index = BM25Index()
+    start = time.perf_counter()
+    for title, text in synthetic_passages(n):
+        index.add(title, text, "synthetic")
+    index.finalize()
+    build_s = time.perf_counter() - start
+
+    rng = random.Random(11)
+    latencies = []
+    for _ in range(queries):
+        query = " ".join(rng.sample(WORDS, rng.randint(2, 5)))
+        start = time.perf_counter()
+        index.search(query, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    report = summarize(latencies)
+    report.update({"passages": n, "build_s": round(build_s, 3),
+                   "passages_per_s": round(n / build_s) if build_s else None})
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark BM25 index build and query time.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps([bench_size(n, args.queries) for n in args.sizes], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Local stand-in for the Ollama HTTP API, for benchmarks and capacity tests
+without a GPU or a real model.
+
+Serves /api/tags and /api/generate (streaming NDJSON and non-streaming).
+Each generation waits a sampled "prompt eval" latency, then emits tokens at
+a fixed rate. It can inject HTTP errors, mid-stream errors, hangs and
+deepseek-style <think> blocks, and it can limit concurrent generations the
+way OLLAMA_NUM_PARALLEL does. The reply restates the quoted question, so it
+passes the assistant's topic-coverage check.
+
+    python -m benchmarks.fake_ollama --port 11500 --latency lognormal:400,0.6 \\
+        --tokens-per-s 25 --error-rate 0.02 --think-rate 1 --parallel 2
+    OLLAMA_BASE_URL=http://127.0.0.1:11500 streamlit run main.py
+
+Latency specs (milliseconds): fixed:MS, uniform:LO,HI, exponential:MEAN,
+lognormal:MEDIAN,SIGMA.
+"""
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_MODEL = "deepseek-r1:1.5b"
+_QUESTION_RE = re.compile(r'Latest user question[^"]*"([^"]+)"', re.IGNORECASE)
+_THINK_FILLER = "the user asks about farming so I should give practical steps".split()
+
+
+def reply_for(prompt):
+    match = _QUESTION_RE.search(prompt or "")
+    question = match.group(1) if match else "your farming question"
+    return (f"For {question}: check soil moisture, follow local extension advice, "
+            "and monitor the field weekly for pests and disease.")
+
+
+def parse_latency(spec):
+    """'lognormal:400,0.6' -> a function returning a latency in seconds."""
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v]
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0] / 1000.0
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(*values) / 1000.0
+    if kind == "exponential" and len(values) == 1:
+        return lambda rng: rng.expovariate(1.0 / values[0]) / 1000.0
+    if kind == "lognormal" and len(values) == 2:
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1]) / 1000.0
+    raise ValueError(f"bad latency spec: {spec!r}")
+
+
+class FakeOllama:
+    def __init__(self, host="127.0.0.1", port=0, model=DEFAULT_MODEL, latency="fixed:20", tokens_per_s=0.0,
+                 error_rate=0.0, stream_error_rate=0.0, hang_rate=0.0, hang_s=60.0, think_rate=0.0,
+                 think_tokens=24, parallel=0, seed=None):
+        self.model = model
+        self.latency = parse_latency(latency)
+        self.tokens_per_s = tokens_per_s
+        self.error_rate = error_rate
+        self.stream_error_rate = stream_error_rate
+        self.hang_rate = hang_rate
+        self.hang_s = hang_s
+        self.think_rate = think_rate
+        self.think_tokens = think_tokens
+        self._slots = threading.BoundedSemaphore(parallel) if parallel else None
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "streamed": 0, "errors": 0, "stream_errors": 0, "hangs": 0,
+                       "tokens": 0, "active": 0, "max_active": 0}
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, obj, status=200):
+                body = json.dumps(obj).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._send_json({"models": [{"name": fake.model}]})
+                else:
+                    self._send_json({"error": "not found"}, status=404)
+
+            def do_POST(self):
+                if self.path != "/api/generate":
+                    self._send_json({"error": "not found"}, status=404)
+                    return
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                try:
+                    fake.handle_generate(self, payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # client cancelled the stream
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _roll(self, rate):
+        with self._lock:
+            return rate > 0 and self._rng.random() < rate
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def _tokens(self, prompt):
+        tokens = [word + " " for word in reply_for(prompt).split(" ")]
+        if self._roll(self.think_rate):
+            filler = (_THINK_FILLER * (self.think_tokens // len(_THINK_FILLER) + 1))[:self.think_tokens]
+            # Split the tags across chunks, as the real model's tokenizer does
+            tokens = ["<th", "ink>"] + [w + " " for w in filler] + ["</thi", "nk>\n"] + tokens
+        return tokens
+
+    def handle_generate(self, handler, payload):
+        self._count("requests")
+        if self._roll(self.error_rate):
+            self._count("errors")
+            handler._send_json({"error": "injected failure"}, status=500)
+            return
+        if self._slots:
+            self._slots.acquire()
+        with self._lock:
+            self._stats["active"] += 1
+            self._stats["max_active"] = max(self._stats["max_active"], self._stats["active"])
+        try:
+            self._generate(handler, payload)
+        finally:
+            self._count("active", -1)
+            if self._slots:
+                self._slots.release()
+
+    def _generate(self, handler, payload):
+        with self._lock:
+            prompt_delay = self.latency(self._rng)
+        if self._roll(self.hang_rate):
+            self._count("hangs")
+            prompt_delay = self.hang_s
+        time.sleep(prompt_delay)
+
+        prompt = payload.get("prompt", "")
+        tokens = self._tokens(prompt)
+        limit = payload.get("options", {}).get("num_predict")
+        if limit and limit > 0:
+            tokens = tokens[:limit]
+        token_delay = 1.0 / self.tokens_per_s if self.tokens_per_s else 0.0
+        final = {"model": self.model, "done": True, "context": [1, 2, 3],
+                 "prompt_eval_count": len(prompt) // 4, "prompt_eval_duration": int(prompt_delay * 1e9),
+                 "eval_count": len(tokens), "eval_duration": int(len(tokens) * token_delay * 1e9)}
+
+        if not payload.get("stream", True):
+            time.sleep(token_delay * len(tokens))
+            self._count("tokens", len(tokens))
+            handler._send_json(dict(final, response="".join(tokens)))
+            return
+
+        self._count("streamed")
+        fail_at = len(tokens) // 2 if self._roll(self.stream_error_rate) else None
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/x-ndjson")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+        for i, token in enumerate(tokens):
+            if i == fail_at:
+                self._count("stream_errors")
+                _write_chunk(handler, {"error": "injected stream failure"})
+                break
+            if token_delay:
+                time.sleep(token_delay)
+            _write_chunk(handler, {"model": self.model, "response": token, "done": False})
+            self._count("tokens")
+        else:
+            _write_chunk(handler, dict(final, response=""))
+        handler.wfile.write(b"0\r\n\r\n")
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _write_chunk(handler, obj):
+    data = (json.dumps(obj) + "\n").encode("utf-8")
+    handler.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+    handler.wfile.flush()
+
+
+def add_server_arguments(parser):
+    """Fake-server options, shared with benchmarks.load_generator."""
+    parser.add_argument("--latency", default="fixed:20", help="prompt-eval latency spec, e.g. lognormal:400,0.6")
+    parser.add_argument("--tokens-per-s", type=float, default=0.0, help="generation rate (0 = instant)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with HTTP 500")
+    parser.add_argument("--stream-error-rate", type=float, default=0.0, help="fraction of streams failing midway")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="fraction of requests that stall")
+    parser.add_argument("--hang-s", type=float, default=60.0, help="how long a stalled request waits")
+    parser.add_argument("--think-rate", type=float, default=0.0, help="fraction of replies with a <think> block")
+    parser.add_argument("--think-tokens", type=int, default=24)
+    parser.add_argument("--parallel", type=int, default=0, help="max concurrent generations (0 = unlimited)")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def server_from_args(args, host="127.0.0.1", port=0):
+    return FakeOllama(host, port, latency=args.latency, tokens_per_s=args.tokens_per_s,
+                      error_rate=args.error_rate, stream_error_rate=args.stream_error_rate,
+                      hang_rate=args.hang_rate, hang_s=args.hang_s, think_rate=args.think_rate,
+                      think_tokens=args.think_tokens, parallel=args.parallel, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake Ollama API for offline runs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+    fake = server_from_args(args, args.host, args.port)
+    print(f"🧪 Fake Ollama listening on {fake.base_url}")
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"📊 {json.dumps(fake.stats())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Concurrent load generator for the assistant.
+
+Simulated users (threads) ask questions through query_with_retry, either
+against a real Ollama (OLLAMA_BASE_URL) or against a fake server started
+in-process with --fake. The report covers answer throughput, latency
+percentiles, and how answers were served: instant (cache or knowledge
+index), model, offline fallback, or error. The answer cache is bypassed
+unless --answer-cache is given, so repeated questions still reach the model.
+
+    python -m benchmarks.load_generator --fake --users 16 --requests 20 \\
+        --latency lognormal:400,0.6 --tokens-per-s 40 --parallel 2 --error-rate 0.05
+    OLLAMA_BASE_URL=http://gpu-box:11434 python -m benchmarks.load_generator --users 4 --duration 60
+"""
+import argparse
+import json
+import os
+import threading
+import time
+
+from benchmarks.fake_ollama import add_server_arguments, server_from_args
+from benchmarks.stats import summarize
+
+QUESTIONS = [
+    "what is organic farming",
+    "how to control pests in rice",
+    "best fertilizer for wheat",
+    "how much water does sugarcane need",
+    "how to treat lumpy skin disease in cows",
+    "when should I sow groundnut",
+    "how to improve clay soil drainage",
+    "what causes yellow leaves in tomato",
+]
+
+
+class LoadResult:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.outcomes = {"model": 0, "instant": 0, "fallback": 0, "error": 0}
+
+    def add(self, latency_ms, outcome):
+        with self.lock:
+            self.latencies.append(latency_ms)
+            self.outcomes[outcome] += 1
+
+
+def _instrument(Assistant):
+    """Record per thread whether an answer came from instant_answer or fallback_answer."""
+    served = threading.local()
+    instant_answer, fallback_answer = Assistant.instant_answer, Assistant.fallback_answer
+
+    def counting_instant(*args, **kwargs):
+        answer = instant_answer(*args, **kwargs)
+        if answer:
+            served.how = "instant"
+        return answer
+
+    def counting_fallback(*args, **kwargs):
+        served.how = "fallback"
+        return fallback_answer(*args, **kwargs)
+
+    Assistant.instant_answer = counting_instant
+    Assistant.fallback_answer = counting_fallback
+    return served
+
+
+def run_load(users, requests_per_user, duration, think_time, lang, strategy, use_answer_cache):
+    import components.Assistant as Assistant
+
+    if not use_answer_cache:
+        from benchmarks.bench_candidates import _NoAnswerCache
+        Assistant.answer_cache = _NoAnswerCache()
+    served = _instrument(Assistant)
+    result = LoadResult()
+    deadline = time.monotonic() + duration if duration else None
+
+    def user(index):
+        n = 0
+        while (deadline and time.monotonic() < deadline) or (not deadline and n < requests_per_user):
+            question = QUESTIONS[(index + n) % len(QUESTIONS)]
+            served.how = "model"
+            start = time.perf_counter()
+            try:
+                answer = Assistant.query_with_retry(question, lang, strategy=strategy, session_id=f"user-{index}")
+                outcome = served.how if answer else "error"
+            except Exception:
+                outcome = "error"
+            result.add((time.perf_counter() - start) * 1000, outcome)
+            n += 1
+            if think_time:
+                time.sleep(think_time)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=user, args=(i,), name=f"user-{i}") for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    total = len(result.latencies)
+    report = {"users": users, "answers": total, "elapsed_s": round(elapsed, 2),
+              "answers_per_s": round(total / elapsed, 2) if elapsed else 0.0}
+    report.update(summarize(result.latencies))
+    report["served"] = dict(result.outcomes)
+    report["fallback_rate"] = round(result.outcomes["fallback"] / total, 4) if total else 0.0
+    report["error_rate"] = round(result.outcomes["error"] / total, 4) if total else 0.0
+    from ollama_backend import ollama_client
+    report["circuit"] = ollama_client.breaker.stats()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the assistant with concurrent simulated users.")
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=10, help="questions per user (ignored with --duration)")
+    parser.add_argument("--duration", type=float, default=0.0, help="run for this many seconds instead")
+    parser.add_argument("--think-time", type=float, default=0.0, help="seconds a user pauses between questions")
+    parser.add_argument("--lang", default="en")
+    parser.add_argument("--strategy", choices=["sequential", "parallel"], default=None)
+    parser.add_argument("--answer-cache", action="store_true", help="let repeated questions hit the answer cache")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON only")
+    parser.add_argument("--fake", action="store_true", help="start a fake Ollama in-process")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    fake = None
+    if args.fake:
+        fake = server_from_args(args).start()
+        # Must be set before ollama_backend is imported
+        os.environ["OLLAMA_BASE_URL"] = fake.base_url
+    try:
+        report = run_load(args.users, args.requests, args.duration, args.think_time, args.lang,
+                          args.strategy, args.answer_cache)
+    finally:
+        if fake:
+            fake.stop()
+    if fake:
+        report["fake_server"] = fake.stats()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"👥 {report['users']} users, {report['answers']} answers in {report['elapsed_s']}s "
+          f"({report['answers_per_s']} answers/s)")
+    print(f"⏱️ p50 {report['p50_ms']} ms | p95 {report['p95_ms']} ms | p99 {report['p99_ms']} ms | max {report['max_ms']} ms")
+    print(f"📦 served: {report['served']} | fallback rate {report['fallback_rate']:.1%} | "
+          f"error rate {report['error_rate']:.1%}")
+    print(f"🔌 circuit: {report['circuit']['state']} (opened {report['circuit']['opened']}x)")
+    if fake:
+        print(f"🧪 fake server: {report['fake_server']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""
+Offline benchmark suite for the app's hot paths.
+
+Every case runs in its own subprocess, so its peak RSS is its own, with
+nothing on the network:
+
+    translation  translate_text / translate_many / page_translator with a stub provider
+    detection    preprocess_image and predict_disease on tiny random Keras models
+    assistant    get_ai_response and query_with_retry against benchmarks.fake_ollama
+    db           db.py record and image inserts/reads and the gallery listing on a scratch database
+    lookups      crop-by-season and weather-forecast lookups
+
+Results (throughput, latency percentiles, peak RSS) are compared with
+benchmarks/baseline.json; anything past the tolerance is flagged and the
+run exits non-zero. Cases whose dependencies aren't installed are skipped.
+
+    python -m benchmarks.suite                       # compare with the baseline
+    python -m benchmarks.suite --update-baseline     # record a new baseline
+    python -m benchmarks.suite --cases db lookups --tolerance 0.5
+"""
+import argparse
+import io
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.stats import summarize
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_FILE = os.path.join(REPO_ROOT, "benchmarks", "baseline.json")
+DEFAULT_TOLERANCE = 0.25      # fraction a metric may worsen before it's flagged
+SEED = 1234
+
+# metric -> True when higher is worse
+COMPARED_METRICS = {"p50_ms": True, "p95_ms": True, "ops_per_s": False, "peak_rss_mb": True}
+
+
+def measure(name, fn, runs, warmup=3):
+    """
+    Time `fn(i)` over `runs` calls after a few untimed warm-up calls. Warm-up
+    uses indices 0..warmup-1 and the timed calls the ones after, so cases
+    sized `runs + warmup` never time an input the warm-up already cached.
+    """
+    warmup = min(warmup, runs)
+    for i in range(warmup):
+        fn(i)
+    latencies = []
+    start = time.perf_counter()
+    for i in range(warmup, warmup + runs):
+        t0 = time.perf_counter()
+        fn(i)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - start
+    result = {"name": name}
+    result.update(summarize(latencies))
+    result["ops_per_s"] = round(runs / elapsed, 2) if elapsed else 0.0
+    return result
+
+
+# --- cases (run inside the child process) ---
+
+def case_translation(scratch, scale):
+    os.environ["FARMIN_TRANSLATION_CACHE"] = os.path.join(scratch, "translation_cache.db")
+    import components.translator as translator
+    from components.crop_suggestion import STATIC_TEXTS
+
+    # Stub provider: deterministic and instant, so only the cache layers are timed
+    translator._provider_translate = lambda text, source, target: f"[{target}] {text}"
+    runs = 200 * scale
+    texts = [f"Apply compost before sowing plot {i}" for i in range(runs + 3)]
+    return [
+        measure("translate_text.miss", lambda i: translator.translate_text(texts[i], "te"), runs),
+        measure("translate_text.hit", lambda i: translator.translate_text(texts[i % 50], "te"), runs),
+        measure("translate_many.50_new",
+                lambda i: translator.translate_many([f"{t} batch {i}" for t in texts[:50]], "hi"), 20 * scale),
+        measure("page_translator.crop_page", lambda i: translator.page_translator("ta", STATIC_TEXTS), 50 * scale),
+    ]
+
+
+def _tiny_models(scratch, input_size, classes):
+    import tensorflow as tf
+
+    paths = {}
+    for model_type, names in classes.items():
+        tf.keras.utils.set_random_seed(SEED)
+        model = tf.keras.Sequential([
+            tf.keras.layers.Input(shape=input_size + (3,)),
+            tf.keras.layers.Conv2D(4, 3, strides=4, activation="relu"),
+            tf.keras.layers.GlobalAveragePooling2D(),
+            tf.keras.layers.Dense(len(names), activation="softmax"),
+        ])
+        paths[model_type] = os.path.join(scratch, f"{model_type}_tiny.h5")
+        model.save(paths[model_type])
+    return paths
+
+
+def _jpeg(seed, size=(1024, 768)):
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 255, size=(size[1], size[0], 3), dtype=np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, format="JPEG", quality=85)
+    return buf.getvalue()
+
+
+def case_detection(scratch, scale):
+    import detection
+
+    for model_type, path in _tiny_models(scratch, detection.INPUT_SIZE, detection.MODEL_CLASSES).items():
+        detection.model_registry.paths[model_type] = path
+    runs = 30 * scale
+    images = [_jpeg(SEED + i) for i in range(runs + 3)]
+    return [
+        measure("preprocess_image.1024x768", lambda i: detection.preprocess_image(images[i]), runs),
+        measure("predict_disease.uncached",
+                lambda i: detection.predict_disease(io.BytesIO(images[i]), "crop"), runs),
+        measure("predict_disease.cached",
+                lambda i: detection.predict_disease(io.BytesIO(images[0]), "crop"), runs),
+    ]
+
+
+def case_assistant(scratch, scale):
+    from benchmarks.fake_ollama import FakeOllama
+
+    fake = FakeOllama(latency="fixed:5").start()
+    os.environ["OLLAMA_BASE_URL"] = fake.base_url
+    os.environ["FARMIN_ANSWER_CACHE"] = os.path.join(scratch, "answer_cache.db")
+    os.environ["FARMIN_TRANSLATION_CACHE"] = os.path.join(scratch, "translation_cache.db")
+    import ollama_backend
+    import components.Assistant as Assistant
+    from benchmarks.bench_candidates import QUESTIONS, bypass_instant_answers
+
+    bypass_instant_answers()
+    runs = 50 * scale
+    prompt = 'Latest user question (answer ONLY this):\n"how to improve soil for wheat"\n\nAssistant:'
+    try:
+        return [
+            measure("get_ai_response", lambda i: ollama_backend.get_ai_response(prompt), runs),
+            measure("query_with_retry.sequential",
+                    lambda i: Assistant.query_with_retry(QUESTIONS[i % len(QUESTIONS)], "en"), runs),
+        ]
+    finally:
+        fake.stop()
+
+
+def case_db(scratch, scale):
+    # Importing db creates its tables, so point it away from farmer_data.db first
+    os.environ["FARMIN_DB"] = os.path.join(scratch, "farmer_data.db")
+    os.environ["FARMIN_IMAGE_STORE"] = os.path.join(scratch, "image_store")
+    import db
+
+    runs = 200 * scale
+    image_path = os.path.join(scratch, "leaf.jpg")
+    rng = random.Random(SEED)
+    with open(image_path, "wb") as f:
+        f.write(b"\xff\xd8\xff" + rng.randbytes(256 * 1024))
+    uploads = [b"\xff\xd8\xff" + rng.randbytes(256 * 1024) for _ in range(50 * scale + 3)]
+    results = [
+        measure("add_record", lambda i: db.add_record("Crop", f"Sowed plot {i}", "2025-07-17"), runs),
+        measure("get_records.all", lambda i: db.get_records(), 20 * scale),
+        measure("insert_image.256KB", lambda i: db.insert_image(f"leaf {i}", "crop", "blight", image_path), 50 * scale),
+        measure("insert_image_bytes.256KB_unique",
+                lambda i: db.insert_image_bytes(f"upload {i}", "cattle", "lumpy skin", uploads[i]), 50 * scale),
+    ]
+    ids = [row[0] for row in db.list_all_images()]
+    results += [
+        measure("list_all_images", lambda i: db.list_all_images(), 20 * scale),
+        measure("query_images.first_page", lambda i: db.query_images(), 20 * scale),
+        measure("query_images.middle_page", lambda i: db.query_images(after=ids[len(ids) // 2]), 20 * scale),
+        measure("get_image_by_id.256KB", lambda i: db.get_image_by_id(ids[i % len(ids)]), runs),
+    ]
+    return results
+
+
+def case_lookups(scratch, scale):
+    from components.crop_suggestion import best_crop, crops_for_season, load_crop_data
+    from components.weather_crop_planner import load_weather_data, recent_forecast, recommend_crops
+
+    crop_data = load_crop_data()
+    weather = load_weather_data()
+    seasons = sorted({crop["season"] for crop in crop_data})
+    cities = sorted(weather)
+    runs = 2000 * scale
+
+    def crop_lookup(i):
+        matches = crops_for_season(crop_data, seasons[i % len(seasons)])
+        if matches:
+            best_crop(matches)
+
+    def weather_lookup(i):
+        forecast = recent_forecast(weather, cities[i % len(cities)])
+        recommend_crops(forecast)
+
+    return [
+        measure("load_crop_data", lambda i: load_crop_data(), 200 * scale),
+        measure("crops_for_season+best_crop", crop_lookup, runs),
+        measure("load_weather_data", lambda i: load_weather_data(), 200 * scale),
+        measure("recent_forecast+recommend_crops", weather_lookup, runs),
+    ]
+
+
+CASES = {
+    "translation": case_translation,
+    "detection": case_detection,
+    "assistant": case_assistant,
+    "db": case_db,
+    "lookups": case_lookups,
+}
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def run_child(case, scale):
+    """Entry point inside the subprocess: prints one JSON object."""
+    random.seed(SEED)
+    with tempfile.TemporaryDirectory(prefix=f"farmin-bench-{case}-") as scratch:
+        try:
+            results = CASES[case](scratch, scale)
+        except ImportError as e:
+            print(json.dumps({"case": case, "skipped": f"missing dependency: {e.name or e}"}))
+            return
+    peak = _peak_rss_mb()
+    for result in results:
+        result["peak_rss_mb"] = peak
+    print(json.dumps({"case": case, "results": results}))
+
+
+def run_case(case, scale):
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmarks.suite", "--child", case, "--scale", str(scale)],
+        capture_output=True, text=True, cwd=REPO_ROOT,
+    )
+    for line in reversed(proc.stdout.strip().splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    return {"case": case, "error": (proc.stderr.strip().splitlines() or ["no output"])[-1]}
+
+
+def compare(results, baseline, tolerance):
+    """List of (benchmark, metric, baseline value, current value) that got worse than allowed."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for metric, higher_is_worse in COMPARED_METRICS.items():
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            worse = new > old * (1 + tolerance) if higher_is_worse else new < old / (1 + tolerance)
+            if worse:
+                regressions.append((name, metric, old, new))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite.")
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES))
+    parser.add_argument("--scale", type=int, default=1, help="multiply iteration counts")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--child", choices=sorted(CASES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.scale)
+        return 0
+
+    results = {}
+    for case in args.cases:
+        outcome = run_case(case, args.scale)
+        if "results" not in outcome:
+            reason = outcome.get("skipped") or outcome.get("error")
+            print(f"⏭️  {case}: {reason}")
+            continue
+        for result in outcome["results"]:
+            name = f"{case}.{result.pop('name')}"
+            results[name] = result
+            print(f"✅ {name:<45} p50 {result['p50_ms']:>9.3f} ms  p95 {result['p95_ms']:>9.3f} ms  "
+                  f"{result['ops_per_s']:>10.1f} ops/s  rss {result['peak_rss_mb']:>7.1f} MB")
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"💾 Baseline written to {args.baseline} ({len(results)} benchmarks)")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("ℹ️ No baseline yet; run with --update-baseline to record one.")
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    for name, metric, old, new in regressions:
+        print(f"❌ Regression in {name}: {metric} {old} -> {new}")
+    if not regressions:
+        print(f"✅ No regressions beyond {args.tolerance:.0%} of the baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""
+Circuit breaker for calls to a flaky backend (the local Ollama server).
+
+    closed     -> calls go through; outcomes over the last `window_seconds`
+                  are tracked, and a slow call counts as a failure
+    open       -> calls are rejected immediately for `open_seconds`, so
+                  callers go straight to their offline fallback
+    half_open  -> a single probe is let through at a time; a few successes
+                  close the circuit, any failure re-opens it for twice as long
+
+acquire() returns a token that the caller hands back to record_success,
+record_failure or release. Outcomes are only counted for calls made in the
+current state (and, while half open, only for the current probe), so a slow
+call started before the circuit opened can't decide a probe.
+
+State changes are logged and passed to any registered listeners; stats()
+returns the current state and counters for display.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+BREAKER_FAILURE_RATE = float(os.environ.get("FARMIN_BREAKER_FAILURE_RATE", "0.5"))
+BREAKER_SLOW_CALL_SECONDS = float(os.environ.get("FARMIN_BREAKER_SLOW_SECONDS", "20"))
+BREAKER_OPEN_SECONDS = float(os.environ.get("FARMIN_BREAKER_OPEN_SECONDS", "15"))
+BREAKER_MAX_OPEN_SECONDS = 300.0   # cap for the doubling after failed probes
+BREAKER_MIN_CALLS = 4              # don't judge the error rate on fewer outcomes
+BREAKER_WINDOW_SECONDS = 60.0
+BREAKER_CLOSE_AFTER = 2            # successful probes needed to close again
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the backend while the circuit is open."""
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_rate=BREAKER_FAILURE_RATE, slow_call_seconds=BREAKER_SLOW_CALL_SECONDS,
+                 open_seconds=BREAKER_OPEN_SECONDS, max_open_seconds=BREAKER_MAX_OPEN_SECONDS,
+                 min_calls=BREAKER_MIN_CALLS, window_seconds=BREAKER_WINDOW_SECONDS,
+                 close_after=BREAKER_CLOSE_AFTER, clock=time.monotonic):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.close_after = close_after
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._outcomes = deque()           # (timestamp, ok) while closed
+        self._state = CLOSED
+        self._changed_at = clock()
+        self._open_for = open_seconds
+        self._generation = 0               # bumped on every state change
+        self._tickets = 0                  # numbers the calls let through
+        self._probe = None                 # token of the half-open probe in flight
+        self._probe_successes = 0
+        self._stats = {"calls": 0, "failures": 0, "slow_calls": 0, "rejected": 0, "opened": 0}
+
+    # --- state ---
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def available(self):
+        """Whether a call would currently be let through (doesn't claim a probe slot)."""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN:
+                return self._clock() - self._changed_at >= self._open_for
+            return self._probe is None
+
+    def add_listener(self, callback):
+        """`callback(name, old_state, new_state)` on every state change."""
+        self._listeners.append(callback)
+
+    def _transition(self, new_state):
+        """Caller holds the lock; returns the change for _notify()."""
+        old_state, self._state = self._state, new_state
+        self._changed_at = self._clock()
+        self._generation += 1
+        self._probe = None
+        self._probe_successes = 0
+        self._outcomes.clear()
+        if new_state == OPEN:
+            self._stats["opened"] += 1
+        return old_state, new_state
+
+    def _notify(self, change):
+        if change is None:
+            return
+        old_state, new_state = change
+        icon = {OPEN: "🔴", HALF_OPEN: "🟡", CLOSED: "🟢"}[new_state]
+        extra = f" for {self._open_for:.0f}s" if new_state == OPEN else ""
+        logger.warning(f"{icon} Circuit '{self.name}' {old_state} -> {new_state}{extra}")
+        for callback in list(self._listeners):
+            try:
+                callback(self.name, old_state, new_state)
+            except Exception as e:
+                logger.warning(f"Circuit listener failed: {e}")
+
+    # --- call accounting ---
+
+    def acquire(self):
+        """
+        Claim permission for one call and return its token; raises
+        CircuitOpenError if the call must not be made.
+        """
+        change = None
+        token = None
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._changed_at >= self._open_for:
+                change = self._transition(HALF_OPEN)
+            if self._state == OPEN or (self._state == HALF_OPEN and self._probe is not None):
+                self._stats["rejected"] += 1
+            else:
+                self._tickets += 1
+                token = (self._generation, self._tickets)
+                if self._state == HALF_OPEN:
+                    self._probe = token
+                self._stats["calls"] += 1
+        self._notify(change)
+        if token is None:
+            raise CircuitOpenError(f"circuit '{self.name}' is open")
+        return token
+
+    def record_success(self, token, latency):
+        """A finished call; one slower than `slow_call_seconds` counts as a failure."""
+        if latency >= self.slow_call_seconds:
+            with self._lock:
+                self._stats["slow_calls"] += 1
+            self._record(token, False)
+        else:
+            self._record(token, True)
+
+    def record_failure(self, token):
+        with self._lock:
+            self._stats["failures"] += 1
+        self._record(token, False)
+
+    def release(self, token):
+        """A call abandoned by the caller (e.g. cancelled): frees its probe slot, no verdict."""
+        with self._lock:
+            if token == self._probe:
+                self._probe = None
+
+    def _record(self, token, ok):
+        change = None
+        with self._lock:
+            now = self._clock()
+            if token[0] != self._generation:
+                # Started before the last state change (e.g. before the circuit
+                # opened): says nothing about the current state
+                pass
+            elif self._state == HALF_OPEN and token == self._probe:
+                self._probe = None
+                if not ok:
+                    self._open_for = min(self._open_for * 2, self.max_open_seconds)
+                    change = self._transition(OPEN)
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.close_after:
+                        self._open_for = self.open_seconds
+                        change = self._transition(CLOSED)
+            elif self._state == CLOSED:
+                self._outcomes.append((now, ok))
+                while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+                    self._outcomes.popleft()
+                total = len(self._outcomes)
+                bad = sum(1 for _, good in self._outcomes if not good)
+                if total >= self.min_calls and bad / total >= self.failure_rate:
+                    change = self._transition(OPEN)
+        self._notify(change)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["state"] = self._state
+            stats["state_age_s"] = round(self._clock() - self._changed_at, 1)
+            if self._state == OPEN:
+                stats["retry_in_s"] = round(max(self._open_for - (self._clock() - self._changed_at), 0.0), 1)
+            total = len(self._outcomes)
+            stats["window_failure_rate"] = (
+                sum(1 for _, good in self._outcomes if not good) / total if total else 0.0
+            )
+        return stats
@@ -2,26 +2,26 @@ import streamlit as st
 import time
 import re
 import logging
-from ollama_backend import get_ai_response
+import os
+import uuid
+from concurrent.futures import FIRST_COMPLETED, wait
+from ollama_backend import build_payload, ollama_client, MODEL_NAME
+from ollama_gateway import generate_via_gateway, get_gateway, stream_via_gateway
+from circuit_breaker import CLOSED
 from voice_assistant import listen_to_voice
 from components.translator import translate_text
 from components.feedback_button import feedback_button
+from components.answer_cache import AnswerCache
+from components.keywords import STOPWORDS, extract_keywords, normalize_question
+from components.conversation import ConversationContext
+from components.knowledge_index import get_index
+import metrics
 
 logger = logging.getLogger(__name__)
 
-STOPWORDS = {
-    "what","is","are","the","a","an","of","and","or","to","in","on","about","for",
-    "please","tell","me","explain","define","meaning","meaningof","how","does","do",
-    "with","by","from","as","at","that","this","those","these","it","its","into"
-}
-
-def extract_keywords(text: str):
-    """Very lightweight keyword extractor (no external libs)."""
-    if not text:
-        return set()
-    txt = re.sub(r"[^a-zA-Z0-9\s\-]", " ", text.lower())
-    parts = [p.strip("-") for p in txt.split()]
-    return {p for p in parts if p and p not in STOPWORDS and len(p) > 2}
+# Repeated questions are answered from here without calling Ollama
+answer_cache = AnswerCache(normalize_question)
+metrics.register_stats("farmin_answer_cache", answer_cache.stats)
 
 def is_definition_query(text: str) -> bool:
     """Detect 'define/what is/meaning of' style queries."""
@@ -82,13 +82,19 @@ def build_definition_style_instruction(latest_user: str) -> str:
         "Avoid repeating earlier terms unless necessary.\n"
     )
 
-def query_with_retry(user_input: str, dest_lang="en", retries=2) -> str:
-    def t(text):
-        try:
-            return translate_text(text, dest_lang)
-        except Exception:
-            return text
+# Expanded farming knowledge for final fallback
+FALLBACK_KNOWLEDGE = {
+    "farming": "Farming is the practice of cultivating land to grow crops and raising animals for food, fiber, and other products.",
+    "organic": "Organic farming avoids synthetic fertilizers and pesticides; it relies on compost, crop rotation, resistant varieties, and biological pest control.",
+    "soil": "Healthy soil improves yields. Add compost or manure, rotate crops, keep ground covered, and avoid over-tillage to protect structure and microbes.",
+    "water": "Good water management reduces stress and waste. Use drip irrigation, mulch to reduce evaporation, schedule watering by soil moisture.",
+    "irrigation": "Irrigation supplies water during dry periods. Common systems: drip (efficient), sprinkler (flexible), furrow/flood (low-cost but less efficient).",
+    "pest": "Pests reduce yields by feeding on crops and spreading disease. Use integrated pest management: monitoring, traps, cultural practices, and targeted controls.",
+    "fertilizer": "Fertilizers add nutrients. Common types: nitrogen (urea), phosphorus (DAP/SSP), potassium (MOP), and organics (compost/manure). Apply by soil test.",
+    "crops": "Crops are plants grown for food, feed, fiber, or biofuel. Examples: cereals (wheat, rice, maize), pulses (chickpea), oilseeds (mustard), vegetables, fruits."
+}
 
+def build_system_prompt(user_input: str, notes=None) -> str:
     # Farming-specific system prompt with strong targeting to latest question
     system_prompt = (
         "You are FarminAi, a helpful farming assistant.\n"
@@ -103,17 +109,188 @@ def query_with_retry(user_input: str, dest_lang="en", retries=2) -> str:
     if is_definition_query(user_input):
         system_prompt += "\n\n" + build_definition_style_instruction(user_input)
 
-    # Expanded farming knowledge for final fallback
-    fallback_knowledge = {
-        "farming": "Farming is the practice of cultivating land to grow crops and raising animals for food, fiber, and other products.",
-        "organic": "Organic farming avoids synthetic fertilizers and pesticides; it relies on compost, crop rotation, resistant varieties, and biological pest control.",
-        "soil": "Healthy soil improves yields. Add compost or manure, rotate crops, keep ground covered, and avoid over-tillage to protect structure and microbes.",
-        "water": "Good water management reduces stress and waste. Use drip irrigation, mulch to reduce evaporation, schedule watering by soil moisture.",
-        "irrigation": "Irrigation supplies water during dry periods. Common systems: drip (efficient), sprinkler (flexible), furrow/flood (low-cost but less efficient).",
-        "pest": "Pests reduce yields by feeding on crops and spreading disease. Use integrated pest management: monitoring, traps, cultural practices, and targeted controls.",
-        "fertilizer": "Fertilizers add nutrients. Common types: nitrogen (urea), phosphorus (DAP/SSP), potassium (MOP), and organics (compost/manure). Apply by soil test.",
-        "crops": "Crops are plants grown for food, feed, fiber, or biofuel. Examples: cereals (wheat, rice, maize), pulses (chickpea), oilseeds (mustard), vegetables, fruits."
-    }
+    # Ground the answer in matching local knowledge
+    if notes is None:
+        notes = reference_notes(user_input)
+    if notes:
+        system_prompt += "\n\n" + notes
+    return system_prompt
+
+RAG_TOP_K = 3
+
+def knowledge_index():
+    """BM25 index over crop_data.json, FALLBACK_KNOWLEDGE and data/knowledge/."""
+    return get_index(FALLBACK_KNOWLEDGE, STOPWORDS)
+
+def knowledge_hits(user_input: str, k=RAG_TOP_K):
+    """One BM25 search per question, shared by instant_answer and reference_notes."""
+    return knowledge_index().search(user_input, k)
+
+def reference_notes(user_input: str, k=RAG_TOP_K, hits=None) -> str:
+    """Top-k passages that match at least half the question's terms, as a prompt block."""
+    if hits is None:
+        hits = knowledge_hits(user_input, k)
+    hits = [h for h in hits[:k] if h.coverage >= 0.5]
+    if not hits:
+        return ""
+    return "Reference notes (use only if relevant):\n" + "\n".join(f"- {h.passage.text}" for h in hits)
+
+def has_history(user_input: str) -> bool:
+    """
+    True when this session has earlier turns. The model sees them, so its
+    answer may depend on them and must not be shared through the answer cache.
+    """
+    messages = st.session_state.get("messages", [])
+    if messages and messages[-1] == {"role": "user", "content": user_input}:
+        messages = messages[:-1]
+    conversation = st.session_state.get("conversation")
+    return bool(messages) or bool(conversation and (conversation.turns or conversation.ollama_context))
+
+def instant_answer(user_input: str, dest_lang="en", hits=None, follow_up=False):
+    """
+    Answer without the LLM: a cached answer, or a confident knowledge-base
+    match. Follow-up turns skip the cache, whose answers were given without history.
+    """
+    if not follow_up:
+        cached = answer_cache.get(user_input, dest_lang, MODEL_NAME)
+        if cached:
+            return cached
+    passage = knowledge_index().direct_answer(user_input, hits=hits)
+    if passage is None:
+        return None
+    if dest_lang == "en":
+        return passage.text
+    return translate_text(passage.text, dest_lang)
+
+def finalize_reply(user_input: str, raw: str, system_prompt: str, dest_lang="en", attempt=0, session_id=None) -> str:
+    """Clean a raw reply and, if it misses the question's keywords, try one targeted correction."""
+    cleaned = clean_response(raw) or raw.strip()
+
+    # If reply doesn't cover the topic terms, do a single targeted correction
+    if not enforce_topic_coverage(user_input, cleaned):
+        logger.info("Topic coverage check failed; issuing targeted correction prompt.")
+        missing_terms = ", ".join(sorted(extract_keywords(user_input)))
+        corrective_prompt = (
+            system_prompt
+            + "\n\nConversation note: Your previous draft did not explicitly address these keywords: "
+            + f"{missing_terms}.\n"
+            "Rewrite a direct 2–4 sentence answer that explicitly mentions these keywords and focuses on farming practice.\n\n"
+            f'Latest user question: "{user_input}"\n\nAssistant:'
+        )
+        corrected = generate_via_gateway(session_id or uuid.uuid4().hex, corrective_prompt, dest_lang, attempt=attempt+1)
+        corrected = clean_response(corrected) if corrected else None
+        if corrected and enforce_topic_coverage(user_input, corrected):
+            return corrected
+        # If still not good, fall back to first cleaned answer
+        return cleaned
+
+    return cleaned
+
+def fallback_answer(user_input: str, dest_lang="en") -> str:
+    """Offline answer used when the model is unavailable."""
+    def t(text):
+        try:
+            return translate_text(text, dest_lang)
+        except Exception:
+            return text
+
+    # Final fallback: dictionary match
+    q_lower = user_input.lower()
+    for keyword, tip in FALLBACK_KNOWLEDGE.items():
+        if keyword in q_lower or (keyword.endswith("s") and keyword[:-1] in q_lower):
+            return t(tip)
+
+    # Then the best local knowledge match, e.g. a crop from crop_data.json
+    hits = knowledge_index().search(user_input, k=1)
+    if hits and hits[0].coverage >= 0.5:
+        return t(hits[0].passage.text)
+
+    return t("I couldn't find an exact answer. Is your question about crops, soil, irrigation, pests, fertilizers, or animals? Please specify so I can be precise.")
+
+def remember_answer(user_input: str, reply: str, dest_lang="en", follow_up=False):
+    """Cache model answers that actually address the question, unless they depend on earlier turns."""
+    if reply and not follow_up and enforce_topic_coverage(user_input, reply):
+        answer_cache.put(user_input, dest_lang, MODEL_NAME, reply)
+
+# "sequential" (draft, then correction/retries) or "parallel" (race several candidates)
+ASSISTANT_STRATEGY = os.environ.get("FARMIN_ASSISTANT_STRATEGY", "sequential")
+CANDIDATE_TEMPERATURES = (0.6, 0.4, 0.8)
+
+def query_parallel(user_input: str, dest_lang="en", temperatures=CANDIDATE_TEMPERATURES,
+                   session_id=None, timeout=40) -> str:
+    """
+    Launch one candidate per temperature through the Ollama gateway and return
+    the first that passes clean_response + enforce_topic_coverage; the rest are
+    cancelled. If none passes, the first usable draft wins, then the offline fallback.
+    Pass the caller's session_id so its candidates share the session's fair
+    share of the gateway and are cancelled by Clear Chat.
+    """
+    hits = knowledge_hits(user_input)
+    instant = instant_answer(user_input, dest_lang, hits=hits, follow_up=has_history(user_input))
+    if instant:
+        return instant
+    return race_candidates(user_input, dest_lang, temperatures, session_id, timeout,
+                           notes=reference_notes(user_input, hits=hits))
+
+def race_candidates(user_input: str, dest_lang="en", temperatures=CANDIDATE_TEMPERATURES,
+                    session_id=None, timeout=40, notes=None) -> str:
+    """The model part of query_parallel, for callers that already checked instant_answer."""
+    gateway = get_gateway()
+    if not gateway.client.is_ready():
+        return fallback_answer(user_input, dest_lang)
+
+    system_prompt = build_system_prompt(user_input, notes)
+    messages = st.session_state.get("messages", [])
+    formatted_prompt = format_prompt(messages, system_prompt, user_input)
+    session_id = session_id or uuid.uuid4().hex
+    jobs = [
+        gateway.submit(session_id, build_payload(formatted_prompt, dest_lang, temperature=temp))
+        for temp in temperatures
+    ]
+
+    first_draft = None
+    deadline = time.monotonic() + timeout
+    pending = {job.future for job in jobs}
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=max(deadline - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.cancelled() or future.exception():
+                    continue
+                cleaned = clean_response(future.result())
+                if not cleaned:
+                    continue
+                if enforce_topic_coverage(user_input, cleaned):
+                    remember_answer(user_input, cleaned, dest_lang, follow_up=has_history(user_input))
+                    return cleaned
+                first_draft = first_draft or cleaned
+    finally:
+        for job in jobs:
+            if job.state in ("queued", "running"):
+                job.cancel()
+
+    if first_draft:
+        return first_draft
+    return fallback_answer(user_input, dest_lang)
+
+def query_with_retry(user_input: str, dest_lang="en", retries=2, strategy=None, session_id=None) -> str:
+    if (strategy or ASSISTANT_STRATEGY) == "parallel":
+        return query_parallel(user_input, dest_lang, session_id=session_id)
+
+    follow_up = has_history(user_input)
+    hits = knowledge_hits(user_input)
+    instant = instant_answer(user_input, dest_lang, hits=hits, follow_up=follow_up)
+    if instant:
+        return instant
+
+    # Circuit open or Ollama down: answer locally instead of waiting on retries
+    if not ollama_client.is_ready():
+        return fallback_answer(user_input, dest_lang)
+
+    system_prompt = build_system_prompt(user_input, reference_notes(user_input, hits=hits))
+    session_id = session_id or uuid.uuid4().hex
 
     # Outer attempts (high-level prompt variants)
     for attempt in range(retries):
@@ -122,43 +299,90 @@ def query_with_retry(user_input: str, dest_lang="en", retries=2) -> str:
             messages = st.session_state.get("messages", [])
             formatted_prompt = format_prompt(messages, system_prompt, user_input)
 
-            raw = get_ai_response(formatted_prompt, dest_lang, attempt=attempt)
+            raw = generate_via_gateway(session_id, formatted_prompt, dest_lang, attempt=attempt)
             if not raw:
+                if not ollama_client.is_ready():
+                    break
                 continue
 
-            cleaned = clean_response(raw) or raw.strip()
-
-            # If reply doesn't cover the topic terms, do a single targeted correction
-            if not enforce_topic_coverage(user_input, cleaned):
-                logger.info("Topic coverage check failed; issuing targeted correction prompt.")
-                missing_terms = ", ".join(sorted(extract_keywords(user_input)))
-                corrective_prompt = (
-                    system_prompt
-                    + "\n\nConversation note: Your previous draft did not explicitly address these keywords: "
-                    + f"{missing_terms}.\n"
-                    "Rewrite a direct 2–4 sentence answer that explicitly mentions these keywords and focuses on farming practice.\n\n"
-                    f'Latest user question: "{user_input}"\n\nAssistant:'
-                )
-                corrected = get_ai_response(corrective_prompt, dest_lang, attempt=attempt+1)
-                corrected = clean_response(corrected) if corrected else None
-                if corrected and enforce_topic_coverage(user_input, corrected):
-                    return corrected
-                # If still not good, fall back to first cleaned answer
-                return cleaned
-
-            return cleaned
+            reply = finalize_reply(user_input, raw, system_prompt, dest_lang, attempt, session_id)
+            remember_answer(user_input, reply, dest_lang, follow_up=follow_up)
+            return reply
 
         except Exception as e:
             logger.error(f"query_with_retry attempt {attempt+1} failed: {e}")
+            if not ollama_client.is_ready():
+                break
             time.sleep(0.8)
 
-    # Final fallback: dictionary match
-    q_lower = user_input.lower()
-    for keyword, tip in fallback_knowledge.items():
-        if keyword in q_lower or (keyword.endswith("s") and keyword[:-1] in q_lower):
-            return t(tip)
+    return fallback_answer(user_input, dest_lang)
 
-    return t("I couldn't find an exact answer. Is your question about crops, soil, irrigation, pests, fertilizers, or animals? Please specify so I can be precise.")
+def get_session_id() -> str:
+    """Stable id for this browser session, used for fair queuing in the Ollama gateway."""
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    return st.session_state.session_id
+
+def get_conversation() -> ConversationContext:
+    """Per-session token-budgeted history and reusable Ollama context."""
+    if "conversation" not in st.session_state:
+        st.session_state.conversation = ConversationContext(MODEL_NAME)
+    return st.session_state.conversation
+
+def stream_query(user_input: str, dest_lang, placeholder) -> str:
+    """
+    Stream the answer into `placeholder` as tokens arrive, then apply the same
+    cleaning and topic-coverage check as query_with_retry. Falls back to the
+    blocking path if nothing was streamed. With the "parallel" strategy the
+    candidates are raced instead (not streamed: only the winner is shown).
+    """
+    follow_up = has_history(user_input)
+    # One knowledge-index search serves the instant answer and the prompt notes
+    hits = knowledge_hits(user_input)
+    instant = instant_answer(user_input, dest_lang, hits=hits, follow_up=follow_up)
+    if instant:
+        placeholder.markdown(f"**🤖 Assistant:** {instant}")
+        get_conversation().record_turn(user_input, instant, reusable=False)
+        return instant
+
+    if ASSISTANT_STRATEGY == "parallel":
+        placeholder.markdown("**🤖 Assistant:** ▌")
+        response = race_candidates(user_input, dest_lang, session_id=get_session_id(),
+                                   notes=reference_notes(user_input, hits=hits))
+        get_conversation().record_turn(user_input, response or "", reusable=False)
+        if response:
+            placeholder.markdown(f"**🤖 Assistant:** {response}")
+        return response
+
+    notes = reference_notes(user_input, hits=hits)
+    system_prompt = build_system_prompt(user_input, notes)
+    conversation = get_conversation()
+    prompt, context = conversation.build_prompt(system_prompt, user_input, notes=notes)
+
+    def show_queue_position(position):
+        placeholder.markdown(f"⏳ {translate_text('Waiting for the assistant. Your place in line:', dest_lang)} #{position}")
+
+    final = {}
+    streamed = ""
+    placeholder.markdown("**🤖 Assistant:** ▌")
+    for piece in stream_via_gateway(get_session_id(), prompt, dest_lang, on_queued=show_queue_position,
+                                    context=context, on_done=final.update):
+        streamed += piece
+        placeholder.markdown(f"**🤖 Assistant:** {streamed}▌")
+
+    if streamed.strip():
+        response = finalize_reply(user_input, streamed, system_prompt, dest_lang, session_id=get_session_id())
+        remember_answer(user_input, response, dest_lang, follow_up=follow_up)
+        # A rewritten answer no longer matches the token state Ollama returned
+        conversation.record_turn(user_input, response, final, reused=context is not None,
+                                 reusable=response == (clean_response(streamed) or streamed.strip()))
+    else:
+        response = query_with_retry(user_input, dest_lang, session_id=get_session_id())
+        conversation.record_turn(user_input, response or "", reusable=False)
+
+    if response:
+        placeholder.markdown(f"**🤖 Assistant:** {response}")
+    return response
 
 def show(dest_lang='en'):
     def t(text):
@@ -195,11 +419,9 @@ def show(dest_lang='en'):
                 query = listen_to_voice()
             if query and query.strip():
                 st.session_state.messages.append({"role": "user", "content": query})
-                with st.spinner(t("Processing...")):
-                    response = query_with_retry(query, dest_lang)
+                response = stream_query(query, dest_lang, st.empty())
                 if response:
                     st.session_state.messages.append({"role": "assistant", "content": response})
-                    st.markdown(f"**🤖 Assistant:** {response}")
             else:
                 st.warning(t("Please speak clearly or try typing your question."))
         except Exception:
@@ -209,6 +431,8 @@ def show(dest_lang='en'):
 
     # Text Assistant
     st.markdown(f"### ⌨️ {t('Text Assistant')}")
+    if ollama_client.breaker.state != CLOSED:
+        st.info(t("The AI model is busy or offline. Answers come from local farming knowledge for now."))
     for message in st.session_state.messages:
         if message["role"] == "user":
             st.markdown(f"**👤 You:** {message['content']}")
@@ -222,17 +446,22 @@ def show(dest_lang='en'):
         st.session_state.messages.append({"role": "user", "content": user_input})
         st.markdown(f"**👤 You:** {user_input}")
         st.markdown("---")
-        with st.spinner(t("Thinking...")):
-            response = query_with_retry(user_input, dest_lang)
+        response = stream_query(user_input, dest_lang, st.empty())
         if response:
             st.session_state.messages.append({"role": "assistant", "content": response})
-            st.markdown(f"**🤖 Assistant:** {response}")
         else:
             st.error(t("Please try again or ask a different question."))
         st.markdown("---")
 
+    timings = get_conversation().timings
+    if timings:
+        with st.expander(f"⏱️ {t('Response timings')}"):
+            st.table(list(timings))
+
     if st.session_state.messages:
         if st.button(t("🗑️ Clear Chat"), type="secondary", use_container_width=True):
+            get_gateway().cancel_session(get_session_id())
+            get_conversation().reset()
             st.session_state.messages = []
             st.rerun()
 
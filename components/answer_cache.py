@@ -0,0 +1,201 @@
+"""
+Answer cache for the farming assistant.
+
+Answers are keyed by (normalized question, language, model name) and stored
+in SQLite with a TTL and an entry cap. Curated answers can be pinned by an
+admin; pinned rows never expire, are never evicted and apply to any model.
+
+    python -m components.answer_cache pin "what is organic farming" "Organic farming is ..." --lang en
+    python -m components.answer_cache list --pinned
+    python -m components.answer_cache unpin "what is organic farming" --lang en
+"""
+import argparse
+import os
+import sqlite3
+import threading
+import time
+
+ANSWER_CACHE_DB = os.environ.get("FARMIN_ANSWER_CACHE", "answer_cache.db")
+ANSWER_CACHE_TTL = 7 * 24 * 60 * 60     # seconds an unpinned answer is reused
+ANSWER_CACHE_MAX_ENTRIES = 20000        # least recently used unpinned rows are evicted above this
+ANY_MODEL = "*"
+
+
+class AnswerCache:
+    def __init__(self, normalize, db_path=ANSWER_CACHE_DB, ttl=ANSWER_CACHE_TTL, max_entries=ANSWER_CACHE_MAX_ENTRIES):
+        """`normalize(question)` returns the cache key text, or "" if the question shouldn't be cached."""
+        self.normalize = normalize
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "pinned_hits": 0, "misses": 0, "stores": 0}
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS answers (
+                question_key TEXT NOT NULL,
+                lang TEXT NOT NULL,
+                model TEXT NOT NULL,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                pinned INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (question_key, lang, model)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_evict ON answers (pinned, accessed_at)")
+        conn.commit()
+        conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def get(self, question, lang, model):
+        """Cached answer for the question, preferring a pinned one; None on miss."""
+        key = self.normalize(question)
+        if not key:
+            return None
+        now = time.time()
+        try:
+            conn = self._connect()
+            row = conn.execute("""
+                SELECT answer, pinned, created_at, model FROM answers
+                WHERE question_key=? AND lang=? AND model IN (?, ?)
+                ORDER BY pinned DESC LIMIT 1
+            """, (key, lang, model, ANY_MODEL)).fetchone()
+            if row is None:
+                conn.close()
+                self._count("misses")
+                return None
+            answer, pinned, created_at, row_model = row
+            if not pinned and now - created_at > self.ttl:
+                conn.execute("DELETE FROM answers WHERE question_key=? AND lang=? AND model=?", (key, lang, row_model))
+                conn.commit()
+                conn.close()
+                self._count("misses")
+                return None
+            conn.execute("UPDATE answers SET accessed_at=? WHERE question_key=? AND lang=? AND model=?",
+                         (now, key, lang, row_model))
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"[Answer Cache Error] {e}")
+            return None
+        self._count("pinned_hits" if pinned else "hits")
+        return answer
+
+    def put(self, question, lang, model, answer):
+        key = self.normalize(question)
+        if not key or not answer:
+            return
+        now = time.time()
+        try:
+            conn = self._connect()
+            conn.execute("""
+                INSERT INTO answers (question_key, lang, model, question, answer, pinned, created_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?, 0, ?, ?)
+                ON CONFLICT (question_key, lang, model) DO UPDATE SET
+                    question=excluded.question, answer=excluded.answer,
+                    created_at=excluded.created_at, accessed_at=excluded.accessed_at
+                WHERE pinned=0
+            """, (key, lang, model, question, answer, now, now))
+            count = conn.execute("SELECT COUNT(*) FROM answers WHERE pinned=0").fetchone()[0]
+            if count > self.max_entries:
+                conn.execute("""
+                    DELETE FROM answers WHERE rowid IN (
+                        SELECT rowid FROM answers WHERE pinned=0 ORDER BY accessed_at ASC LIMIT ?
+                    )
+                """, (count - self.max_entries,))
+            conn.commit()
+            conn.close()
+            self._count("stores")
+        except Exception as e:
+            print(f"[Answer Cache Error] {e}")
+
+    def pin(self, question, answer, lang="en", model=ANY_MODEL):
+        """Store a curated answer that never expires and overrides generated ones."""
+        key = self.normalize(question)
+        if not key:
+            raise ValueError("question has no keywords to match on")
+        now = time.time()
+        conn = self._connect()
+        conn.execute("""
+            INSERT OR REPLACE INTO answers (question_key, lang, model, question, answer, pinned, created_at, accessed_at)
+            VALUES (?, ?, ?, ?, ?, 1, ?, ?)
+        """, (key, lang, model, question, answer, now, now))
+        conn.commit()
+        conn.close()
+        return key
+
+    def unpin(self, question, lang="en", model=ANY_MODEL):
+        conn = self._connect()
+        cur = conn.execute("DELETE FROM answers WHERE question_key=? AND lang=? AND model=? AND pinned=1",
+                           (self.normalize(question), lang, model))
+        conn.commit()
+        conn.close()
+        return cur.rowcount
+
+    def entries(self, pinned_only=False):
+        conn = self._connect()
+        query = "SELECT question_key, lang, model, question, answer, pinned FROM answers"
+        if pinned_only:
+            query += " WHERE pinned=1"
+        rows = conn.execute(query + " ORDER BY accessed_at DESC").fetchall()
+        conn.close()
+        return rows
+
+    def clear(self, include_pinned=False):
+        conn = self._connect()
+        conn.execute("DELETE FROM answers" if include_pinned else "DELETE FROM answers WHERE pinned=0")
+        conn.commit()
+        conn.close()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["pinned_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["pinned_hits"]) / lookups if lookups else 0.0
+        return stats
+
+
+def main():
+    from components.keywords import normalize_question
+
+    answer_cache = AnswerCache(normalize_question)
+    parser = argparse.ArgumentParser(description="Manage the assistant's answer cache.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    pin = sub.add_parser("pin", help="add or replace a curated answer")
+    pin.add_argument("question")
+    pin.add_argument("answer")
+    pin.add_argument("--lang", default="en")
+    unpin = sub.add_parser("unpin", help="remove a curated answer")
+    unpin.add_argument("question")
+    unpin.add_argument("--lang", default="en")
+    listing = sub.add_parser("list", help="show cached answers")
+    listing.add_argument("--pinned", action="store_true")
+    clear = sub.add_parser("clear", help="drop generated answers")
+    clear.add_argument("--all", action="store_true", help="also drop pinned answers")
+    args = parser.parse_args()
+
+    if args.command == "pin":
+        key = answer_cache.pin(args.question, args.answer, args.lang)
+        print(f"📌 Pinned answer for '{key}' ({args.lang})")
+    elif args.command == "unpin":
+        print(f"🗑️ Removed {answer_cache.unpin(args.question, args.lang)} pinned answer(s)")
+    elif args.command == "list":
+        for key, lang, model, question, answer, pinned in answer_cache.entries(args.pinned):
+            marker = "📌" if pinned else "  "
+            print(f"{marker} [{lang}/{model}] {key}: {answer[:80]}")
+    elif args.command == "clear":
+        answer_cache.clear(include_pinned=args.all)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Token-budgeted conversation context for the assistant.
+
+Recent turns are kept verbatim while they fit the token budget; older turns
+are folded into a short extractive memory. After a streamed turn, Ollama's
+returned `context` (the evaluated token state) is kept, so the next turn
+only sends the new question instead of re-sending the whole history.
+"""
+import re
+from collections import deque
+
+HISTORY_TOKEN_BUDGET = 768     # verbatim history sent when the Ollama context can't be reused
+CONTEXT_TOKEN_LIMIT = 3072     # drop the reused context before it nears the model's window
+MEMORY_TOKEN_BUDGET = 192      # cap for the folded summary of older turns
+TIMINGS_KEPT = 8               # per-turn stats kept, same window as the chat history quoted in prompts
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English; no tokenizer dependency)."""
+    if not text:
+        return 0
+    return max(1, (len(text) + 3) // 4)
+
+
+def _first_sentence(text: str, limit: int = 160) -> str:
+    text = re.sub(r"\s+", " ", text or "").strip()
+    match = re.match(r"(.+?[.!?])(\s|$)", text)
+    sentence = match.group(1) if match else text
+    return sentence[:limit].rstrip()
+
+
+def _trim_to_tokens(text: str, budget: int) -> str:
+    limit = budget * 4
+    return text if len(text) <= limit else text[len(text) - limit:].lstrip()
+
+
+class ConversationContext:
+    def __init__(self, model_name: str, history_budget=HISTORY_TOKEN_BUDGET,
+                 context_limit=CONTEXT_TOKEN_LIMIT, memory_budget=MEMORY_TOKEN_BUDGET, timings_kept=TIMINGS_KEPT):
+        self.model_name = model_name
+        self.history_budget = history_budget
+        self.context_limit = context_limit
+        self.memory_budget = memory_budget
+        self.turns = []            # [(user, assistant)] kept verbatim
+        self.memory = ""           # folded summary of older turns
+        self.ollama_context = None
+        self.context_tokens = 0
+        self.timings = deque(maxlen=timings_kept)   # latest per-turn prompt-eval vs generation stats
+
+    def reset(self):
+        self.turns, self.memory = [], ""
+        self.ollama_context, self.context_tokens = None, 0
+        self.timings.clear()
+
+    def _history_tokens(self):
+        return sum(estimate_tokens(u) + estimate_tokens(a) for u, a in self.turns)
+
+    def _fold_old_turns(self):
+        """Move the oldest turns into memory until the verbatim history fits the budget."""
+        while len(self.turns) > 1 and self._history_tokens() > self.history_budget:
+            user, assistant = self.turns.pop(0)
+            note = f"- Q: {_first_sentence(user, 100)} A: {_first_sentence(assistant)}"
+            self.memory = _trim_to_tokens(f"{self.memory}\n{note}".strip(), self.memory_budget)
+
+    def build_prompt(self, system_prompt: str, latest_user: str, notes: str = ""):
+        """
+        Return (prompt, context). With a reusable Ollama context only the new
+        question (plus any retrieval `notes`) is sent; otherwise the system
+        prompt, memory and recent turns are. `system_prompt` is expected to
+        already carry the notes.
+        """
+        question = (
+            "\nLatest user question (answer ONLY this):\n"
+            f"\"{latest_user.strip()}\"\n\n"
+            "Assistant:"
+        )
+        if self.ollama_context:
+            return (notes + "\n" + question if notes else question), self.ollama_context
+
+        prompt = system_prompt.rstrip() + "\n\n"
+        if self.memory:
+            prompt += "Earlier in this conversation:\n" + self.memory + "\n\n"
+        if self.turns:
+            prompt += "Conversation context:\n"
+            for user, assistant in self.turns:
+                prompt += f"User: {user}\nAssistant: {assistant}\n"
+        return prompt + question, None
+
+    def record_turn(self, user: str, assistant: str, final_chunk=None, reused=False, reusable=True):
+        """
+        Store a finished turn. `final_chunk` is Ollama's last streamed object
+        (with `context` and eval counters); `reusable=False` discards the
+        context, e.g. when the shown answer was rewritten after generation.
+        """
+        self.turns.append((user, assistant))
+        self._fold_old_turns()
+
+        final_chunk = final_chunk or {}
+        prompt_tokens = final_chunk.get("prompt_eval_count", 0)
+        eval_tokens = final_chunk.get("eval_count", 0)
+        self.timings.append({
+            "reused_context": reused,
+            "prompt_tokens": prompt_tokens,
+            "prompt_eval_ms": round(final_chunk.get("prompt_eval_duration", 0) / 1e6, 1),
+            "eval_tokens": eval_tokens,
+            "eval_ms": round(final_chunk.get("eval_duration", 0) / 1e6, 1),
+        })
+
+        context = final_chunk.get("context")
+        self.context_tokens = len(context) if context else 0
+        if reusable and context and self.context_tokens < self.context_limit:
+            self.ollama_context = context
+        else:
+            # Rebuild from memory + recent turns next time
+            self.ollama_context = None
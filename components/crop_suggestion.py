@@ -1,14 +1,53 @@
 import streamlit as st
 import json
-from components.translator import translate_text
+from components.translator import page_translator, translate_many
 from components.feedback_button import feedback_button  # Import the feedback component
 
+CROP_DATA_FILE = "data/crop_data.json"
+CROP_FIELDS = ["crop", "season", "weather", "soil", "duration", "investment", "profit", "how_to_start"]
+
+STATIC_TEXTS = [
+    "🌿 Crop Suggestion Based on Season",
+    "Enter the season to get crop suggestions that match weather, soil, and duration.",
+    "❌ 'crop_data.json' not found in 'data/' folder.",
+    "Enter Season (e.g. Summer, Winter, Monsoon)",
+    "Type a season...",
+    "Found",
+    "crop(s) for the season",
+    "Season",
+    "Weather Condition",
+    "Soil Type",
+    "Duration",
+    "Investment",
+    "Expected Profit",
+    "How to Start",
+    "Best Crop to Cultivate Among These",
+    "has the highest expected profit among the suggested crops.",
+    "No crop suggestions found for season",
+    "Please enter a season to get crop suggestions.",
+]
+
+def load_crop_data(path=CROP_DATA_FILE):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def crops_for_season(crop_data, season):
+    """Crops whose season matches, ignoring case and surrounding spaces."""
+    season = season.strip().lower()
+    return [crop for crop in crop_data if crop["season"].strip().lower() == season]
+
+def extract_profit(value):
+    try:
+        return float(''.join(filter(str.isdigit, value)))
+    except:
+        return 0
+
+def best_crop(crops):
+    """The crop with the highest expected profit (digits of the profit text)."""
+    return max(crops, key=lambda crop: extract_profit(crop['profit']))
+
 def show(dest_lang='en'):
-    def t(text):
-        try:
-            return translate_text(text, dest_lang)
-        except:
-            return text
+    t = page_translator(dest_lang, STATIC_TEXTS)
 
     # Add the feedback button at the top
     feedback_button("crop_suggestion")
@@ -26,8 +65,7 @@ def show(dest_lang='en'):
     st.markdown("---")
 
     try:
-        with open("data/crop_data.json", "r", encoding="utf-8") as f:
-            crop_data = json.load(f)
+        crop_data = load_crop_data()
     except FileNotFoundError:
         st.error(t("❌ 'crop_data.json' not found in 'data/' folder."))
         return
@@ -38,10 +76,7 @@ def show(dest_lang='en'):
     )
 
     if season_input:
-        matching_crops = [
-            crop for crop in crop_data
-            if crop["season"].strip().lower() == season_input.strip().lower()
-        ]
+        matching_crops = crops_for_season(crop_data, season_input)
 
         if matching_crops:
             st.success(
@@ -49,20 +84,27 @@ def show(dest_lang='en'):
             )
             st.markdown("")
 
+            # Translate every field of every matching card in one batch
+            field_values = [crop[field] for crop in matching_crops for field in CROP_FIELDS]
+            translated_fields = dict(zip(field_values, translate_many(field_values, dest_lang)))
+
+            def tf(value):
+                return translated_fields.get(value, value)
+
             # Display matching crops
             for crop in matching_crops:
                 st.markdown(
                     f"""
                     <div style="border: 1px solid #444; padding: 15px; border-radius: 10px; background-color: #1e1e1e; color: #f0f0f0; margin-bottom: 20px;">
-                        <h4 style="color: #81c784;">🌾 {t(crop['crop'])}</h4>
+                        <h4 style="color: #81c784;">🌾 {tf(crop['crop'])}</h4>
                         <ul style="padding-left: 20px; line-height: 1.6;">
-                            <li><strong>{t("Season")}:</strong> {t(crop['season'])}</li>
-                            <li><strong>{t("Weather Condition")}:</strong> {t(crop['weather'])}</li>
-                            <li><strong>{t("Soil Type")}:</strong> {t(crop['soil'])}</li>
-                            <li><strong>{t("Duration")}:</strong> {t(crop['duration'])}</li>
-                            <li><strong>{t("Investment")}:</strong> {t(crop['investment'])}</li>
-                            <li><strong>{t("Expected Profit")}:</strong> {t(crop['profit'])}</li>
-                            <li><strong>{t("How to Start")}:</strong> {t(crop['how_to_start'])}</li>
+                            <li><strong>{t("Season")}:</strong> {tf(crop['season'])}</li>
+                            <li><strong>{t("Weather Condition")}:</strong> {tf(crop['weather'])}</li>
+                            <li><strong>{t("Soil Type")}:</strong> {tf(crop['soil'])}</li>
+                            <li><strong>{t("Duration")}:</strong> {tf(crop['duration'])}</li>
+                            <li><strong>{t("Investment")}:</strong> {tf(crop['investment'])}</li>
+                            <li><strong>{t("Expected Profit")}:</strong> {tf(crop['profit'])}</li>
+                            <li><strong>{t("How to Start")}:</strong> {tf(crop['how_to_start'])}</li>
                         </ul>
                     </div>
                     """,
@@ -70,17 +112,11 @@ def show(dest_lang='en'):
                 )
 
             # BEST CROP LOGIC BASED ON PROFIT (Assuming profit is in numbers)
-            def extract_profit(value):
-                try:
-                    return float(''.join(filter(str.isdigit, value)))
-                except:
-                    return 0
-
-            best_crop = max(matching_crops, key=lambda crop: extract_profit(crop['profit']))
+            best = best_crop(matching_crops)
 
             st.markdown("### 🥇 " + t("Best Crop to Cultivate Among These"))
             st.success(
-                f"🌱 **{t(best_crop['crop'])}** - {t('has the highest expected profit among the suggested crops.')}"
+                f"🌱 **{tf(best['crop'])}** - {t('has the highest expected profit among the suggested crops.')}"
             )
 
         else:
@@ -1,5 +1,5 @@
 import streamlit as st
-from detection import predict_disease
+from detection import predict_disease_with_info
 from components.translator import translate_text
 from components.feedback_button import feedback_button  # Import the feedback component
 
@@ -59,9 +59,11 @@ def show(dest_lang='en'):
         model_type = type_map.get(detection_type, "crop")
 
         with st.spinner(t("Analyzing image...")):
-            result = predict_disease(uploaded_file, model_type=model_type)
+            result, from_cache = predict_disease_with_info(uploaded_file, model_type=model_type)
 
         st.success(f"🧪 {t('Prediction for')} {detection_type}: **{t(result)}**")
+        if from_cache:
+            st.caption(f"⚡ {t('Served from cache (this image was analyzed before)')}")
 
     # Footer spacing
     st.markdown("<br><br>", unsafe_allow_html=True)
\ No newline at end of file
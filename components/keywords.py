@@ -0,0 +1,25 @@
+"""
+Keyword extraction shared by the assistant and its answer cache.
+
+Kept free of heavy imports so the answer cache CLI can use it without
+loading streamlit, the speech stack or the Ollama gateway.
+"""
+import re
+
+STOPWORDS = {
+    "what","is","are","the","a","an","of","and","or","to","in","on","about","for",
+    "please","tell","me","explain","define","meaning","meaningof","how","does","do",
+    "with","by","from","as","at","that","this","those","these","it","its","into"
+}
+
+def extract_keywords(text: str):
+    """Very lightweight keyword extractor (no external libs)."""
+    if not text:
+        return set()
+    txt = re.sub(r"[^a-zA-Z0-9\s\-]", " ", text.lower())
+    parts = [p.strip("-") for p in txt.split()]
+    return {p for p in parts if p and p not in STOPWORDS and len(p) > 2}
+
+def normalize_question(text: str) -> str:
+    """Order-independent keyword key, so rephrasings of a question share an answer."""
+    return " ".join(sorted(extract_keywords(text)))
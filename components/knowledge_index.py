@@ -0,0 +1,181 @@
+"""
+Local BM25 retrieval over the assistant's offline farming knowledge.
+
+The index covers data/crop_data.json, the assistant's fallback entries and
+any extra corpus files dropped into data/knowledge/ (.txt/.md split on blank
+lines, .jsonl with "title"/"text" fields). It is built once per process and
+used two ways: confident lookups are answered directly without the LLM, and
+the top passages are added to the prompt as reference notes.
+"""
+import glob
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+
+CROP_DATA_FILE = "data/crop_data.json"
+EXTRA_CORPUS_DIR = "data/knowledge"
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+DIRECT_MIN_COVERAGE = 1.0   # every query term must appear in the passage
+DIRECT_MIN_MARGIN = 1.5     # and it must clearly beat the runner-up
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+class Passage:
+    __slots__ = ("id", "title", "text", "source")
+
+    def __init__(self, id, title, text, source):
+        self.id = id
+        self.title = title
+        self.text = text
+        self.source = source
+
+
+class SearchHit:
+    __slots__ = ("passage", "score", "coverage")
+
+    def __init__(self, passage, score, coverage):
+        self.passage = passage
+        self.score = score
+        self.coverage = coverage
+
+
+class BM25Index:
+    def __init__(self, stopwords=()):
+        self.stopwords = frozenset(stopwords)
+        self.passages = []
+        self._postings = defaultdict(list)   # term -> [(doc_id, term_freq)]
+        self._doc_len = []
+        self._doc_norm = []                  # k1 * length normalization, per passage
+        self._idf = {}
+        self._avgdl = 0.0
+
+    def tokenize(self, text):
+        tokens = []
+        for tok in _TOKEN_RE.findall((text or "").lower()):
+            if tok in self.stopwords or len(tok) < 2:
+                continue
+            # Light plural folding so "pests" matches "pest"
+            if len(tok) > 3 and tok.endswith("s") and not tok.endswith("ss"):
+                tok = tok[:-1]
+            tokens.append(tok)
+        return tokens
+
+    def add(self, title, text, source):
+        doc_id = len(self.passages)
+        self.passages.append(Passage(doc_id, title, text, source))
+        counts = Counter(self.tokenize(f"{title} {text}"))
+        for term, tf in counts.items():
+            self._postings[term].append((doc_id, tf))
+        self._doc_len.append(sum(counts.values()))
+
+    def finalize(self):
+        """Compute IDF and average length once all passages are added."""
+        n = len(self.passages)
+        self._avgdl = (sum(self._doc_len) / n) if n else 0.0
+        self._doc_norm = [
+            BM25_K1 * (1 - BM25_B + BM25_B * dl / self._avgdl) if self._avgdl else BM25_K1
+            for dl in self._doc_len
+        ]
+        self._idf = {
+            term: math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+        return self
+
+    def search(self, query, k=3):
+        terms = set(self.tokenize(query))
+        if not terms or not self.passages:
+            return []
+        scores = defaultdict(float)
+        matched = defaultdict(int)
+        doc_norm = self._doc_norm
+        for term in terms:
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            weight = idf * (BM25_K1 + 1)
+            for doc_id, tf in self._postings[term]:
+                scores[doc_id] += weight * tf / (tf + doc_norm[doc_id])
+                matched[doc_id] += 1
+        top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [SearchHit(self.passages[d], s, matched[d] / len(terms)) for d, s in top]
+
+    def direct_answer(self, query, hits=None):
+        """
+        The top passage when it covers the whole query and clearly beats the
+        runner-up. Pass `hits` from an earlier search(query, k >= 2) to reuse it.
+        """
+        if hits is None:
+            hits = self.search(query, k=2)
+        if not hits or hits[0].coverage < DIRECT_MIN_COVERAGE:
+            return None
+        if len(hits) > 1 and hits[0].score < DIRECT_MIN_MARGIN * hits[1].score:
+            return None
+        return hits[0].passage
+
+    def __len__(self):
+        return len(self.passages)
+
+
+def _crop_passages(path=CROP_DATA_FILE):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            crops = json.load(f)
+    except FileNotFoundError:
+        return
+    for crop in crops:
+        text = (
+            f"{crop['crop']} is a {crop['season'].lower()} season crop for {crop['weather'].lower()} weather. "
+            f"Soil: {crop['soil']}. Duration: {crop['duration']}. "
+            f"Investment: {crop['investment']}. Expected profit: {crop['profit']}. "
+            f"How to start: {crop['how_to_start']}"
+        )
+        yield crop["crop"], text, "crop_data"
+
+
+def _extra_passages(corpus_dir=EXTRA_CORPUS_DIR):
+    for path in sorted(glob.glob(os.path.join(corpus_dir, "*"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        if path.endswith(".jsonl"):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        row = json.loads(line)
+                        yield row.get("title", name), row["text"], path
+        elif path.endswith((".txt", ".md")):
+            with open(path, "r", encoding="utf-8") as f:
+                for block in re.split(r"\n\s*\n", f.read()):
+                    if block.strip():
+                        yield name, block.strip(), path
+
+
+def build_index(fallback_knowledge=None, stopwords=(), crop_file=CROP_DATA_FILE, corpus_dir=EXTRA_CORPUS_DIR):
+    index = BM25Index(stopwords)
+    for keyword, text in (fallback_knowledge or {}).items():
+        index.add(keyword, text, "fallback")
+    for title, text, source in _crop_passages(crop_file):
+        index.add(title, text, source)
+    for title, text, source in _extra_passages(corpus_dir):
+        index.add(title, text, source)
+    return index.finalize()
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index(fallback_knowledge=None, stopwords=()):
+    """Process-wide index, built on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = build_index(fallback_knowledge, stopwords)
+            print(f"📚 Knowledge index built with {len(_index)} passages")
+        return _index
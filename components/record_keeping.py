@@ -1,11 +1,137 @@
 # pages/record_keeping.py
 import streamlit as st
-from db import add_record, get_records, insert_image, list_all_images, get_image_by_id
+from db import add_record, query_records, page_cursor, insert_image_bytes, query_images, get_image_entry
+from records_io import FORMATS, import_file, export_chunks, format_for
 from components.translator import translate_text
 from components.feedback_button import feedback_button  # Import the feedback component
 import datetime
+import io
 import os
 
+def show_records_page(t):
+    """Filtered records one page at a time; keyset cursors live in session state."""
+    type_options = [t("All"), t("Dairy"), t("Poultry"), t("Crop")]
+    col1, col2 = st.columns(2)
+    with col1:
+        type_filter = st.selectbox(f"🔎 {t('Filter by type')}", type_options, key="records_type_filter")
+    with col2:
+        use_dates = st.checkbox(f"📅 {t('Filter by date')}", key="records_use_dates")
+    date_from = date_to = None
+    if use_dates:
+        col1, col2 = st.columns(2)
+        today = datetime.date.today()
+        date_from = col1.date_input(t("From"), value=today - datetime.timedelta(days=30), key="records_from")
+        date_to = col2.date_input(t("To"), value=today, key="records_to")
+    record_type = None if type_filter == type_options[0] else type_filter
+    filters = dict(record_type=record_type,
+                   date_from=date_from.isoformat() if date_from else None,
+                   date_to=date_to.isoformat() if date_to else None)
+
+    state = st.session_state.get("records_page")
+    if state is None or state["filters"] != filters:
+        state = st.session_state["records_page"] = {"filters": filters, "after": None, "before": None, "page": 0}
+
+    rows, has_more = query_records(after=state["after"], before=state["before"], **filters)
+    has_next = has_more if state["before"] is None else True
+    if state["before"] is not None and not has_more:
+        # Walked back to the start: show a full first page
+        state.update(after=None, before=None, page=0)
+        rows, has_next = query_records(**filters)
+
+    def go_next():
+        state.update(after=page_cursor(rows[-1]), before=None, page=state["page"] + 1)
+
+    def go_prev():
+        state.update(after=None, before=page_cursor(rows[0]), page=state["page"] - 1)
+
+    if rows:
+        st.table(rows)
+    else:
+        st.info(t("No records found."))
+    col1, col2, col3 = st.columns([1, 2, 1])
+    col1.button(f"⬅️ {t('Previous')}", on_click=go_prev, disabled=state["page"] == 0 or not rows,
+                key="records_prev")
+    col2.caption(f"{t('Page')} {state['page'] + 1}")
+    col3.button(f"{t('Next')} ➡️", on_click=go_next, disabled=not has_next or not rows, key="records_next")
+
+def show_bulk_import_export(t):
+    """CSV/JSONL import (one transaction, bad rows reported) and export of records or image metadata."""
+    kinds = {t("Records"): "records", t("Disease image metadata"): "images"}
+    kind = kinds[st.selectbox(f"🗂️ {t('Data')}", list(kinds), key="bulk_kind")]
+
+    upload = st.file_uploader(f"📥 {t('Import CSV or JSONL file')}", type=["csv", "jsonl", "json", "ndjson"],
+                              key="bulk_upload")
+    strict = st.checkbox(t("Import only if every row is valid"), key="bulk_strict")
+    if upload and st.button(f"📥 {t('Import')}", key="bulk_import"):
+        # utf-8-sig drops the BOM spreadsheet programs put on CSV files
+        text = io.TextIOWrapper(upload, encoding="utf-8-sig", newline="")
+        result = import_file(text, format_for(upload.name), kind, strict=strict)
+        if result.imported:
+            st.success(f"✅ {t('Imported rows')}: {result.imported}")
+        if result.failed:
+            st.warning(f"⚠️ {t('Rejected rows')}: {result.failed}"
+                       + (f" — {t('nothing was imported')}" if strict else ""))
+            st.table([{"line": line, "error": message} for line, message in result.errors])
+
+    fmt = st.radio(t("Export format"), FORMATS, horizontal=True, key="bulk_format")
+    if st.button(f"📤 {t('Prepare export')}", key="bulk_export"):
+        st.download_button(f"⬇️ {t('Download')}", "".join(export_chunks(kind, fmt)),
+                           file_name=f"{kind}.{fmt}", mime="text/csv" if fmt == "csv" else "application/x-ndjson")
+
+GALLERY_COLUMNS = 4
+
+def _set_state(key, value):
+    st.session_state[key] = value
+
+def show_gallery(t):
+    """Thumbnail grid a page at a time; a full-size image is only sent when its entry is opened."""
+    opened = st.session_state.get("gallery_open")
+    entry = get_image_entry(opened) if opened is not None else None
+    if entry:
+        img_id, name, cat, desc, image_path, _ = entry
+        st.markdown(f"**🆔 ID:** {img_id} | **📛 {t('Name')}:** {name} | **📂 {t('Category')}:** {cat}")
+        st.markdown(f"**📝 {t('Description')}:** {desc}")
+        if os.path.exists(image_path):
+            st.image(image_path, caption=name, use_column_width=True)
+        st.button(f"✖️ {t('Close')}", on_click=_set_state, args=("gallery_open", None), key="gallery_close")
+        st.markdown("---")
+
+    # Keyset cursors on image id, as for the records table
+    state = st.session_state.setdefault("gallery_page", {"after": None, "before": None, "page": 0})
+    images, has_more = query_images(after=state["after"], before=state["before"])
+    has_next = has_more if state["before"] is None else True
+    if state["before"] is not None and not has_more:
+        # Walked back to the start: show a full first page
+        state.update(after=None, before=None, page=0)
+        images, has_next = query_images()
+    if not images:
+        st.info(f"{t('No disease images stored yet.')}")
+        return
+
+    def go_next():
+        state.update(after=images[-1][0], before=None, page=state["page"] + 1)
+
+    def go_prev():
+        state.update(after=None, before=images[0][0], page=state["page"] - 1)
+
+    for start in range(0, len(images), GALLERY_COLUMNS):
+        for col, img in zip(st.columns(GALLERY_COLUMNS), images[start:start + GALLERY_COLUMNS]):
+            img_id, name, cat, desc, image_path, thumbnail_path = img
+            with col:
+                # Images saved before thumbnails existed (or that couldn't be decoded) show the original
+                preview = thumbnail_path or image_path
+                if os.path.exists(preview):
+                    st.image(preview, caption=name, use_column_width=True)
+                st.caption(f"🆔 {img_id} | 📂 {cat}")
+                st.button(f"🔍 {t('Open')}", on_click=_set_state, args=("gallery_open", img_id),
+                          key=f"gallery_open_{img_id}")
+
+    if state["page"] > 0 or has_next:
+        col1, col2, col3 = st.columns([1, 2, 1])
+        col1.button(f"⬅️ {t('Previous')}", on_click=go_prev, disabled=state["page"] == 0, key="gallery_prev")
+        col2.caption(f"{t('Page')} {state['page'] + 1}")
+        col3.button(f"{t('Next')} ➡️", on_click=go_next, disabled=not has_next, key="gallery_next")
+
 def show(dest_lang='en'):
     def t(text):
         try:
@@ -29,8 +155,10 @@ def show(dest_lang='en'):
         st.success(f"✅ {t('Record saved successfully!')}")
 
     if st.checkbox(f"📜 {t('Show All Records')}"):
-        records = get_records()
-        st.table(records)
+        show_records_page(t)
+
+    with st.expander(f"📦 {t('Bulk Import / Export')}"):
+        show_bulk_import_export(t)
 
     # Section 2 — Disease Image Upload
     st.subheader(f"🦠 {t('Upload Crop/Cattle Disease Image')}")
@@ -42,30 +170,11 @@ def show(dest_lang='en'):
 
     if st.button(f"🧬 {t('Save Disease Image')}"):
         if image_file and image_name and category:
-            # Save temp image
-            temp_path = "temp_image.jpg"
-            with open(temp_path, "wb") as f:
-                f.write(image_file.read())
-            insert_image(image_name, category, description, temp_path)
-            os.remove(temp_path)  # Clean up after storing
+            insert_image_bytes(image_name, category, description, image_file.getvalue())
             st.success(f"✅ {t('Disease image saved!')}")
         else:
             st.warning(f"⚠️ {t('Please fill all fields and upload an image.')}")
 
-    # Section 3 — Show All Images with Previews
+    # Section 3 — Gallery of stored images (thumbnails; originals on demand)
     if st.checkbox(f"🖼️ {t('Show Stored Disease Images')}"):
-        images = list_all_images()
-        if images:
-            for img in images:
-                img_id, name, cat, desc = img
-                st.markdown(f"**🆔 ID:** {img_id} | **📛 {t('Name')}:** {name} | **📂 {t('Category')}:** {cat}")
-                st.markdown(f"**📝 {t('Description')}:** {desc}")
-                
-                # Get image blob
-                data = get_image_by_id(img_id)
-                if data:
-                    _, _, _, image_blob = data
-                    st.image(image_blob, caption=name, use_column_width=True)
-                st.markdown("---")
-        else:
-            st.info(f"{t('No disease images stored yet.')}")
\ No newline at end of file
+        show_gallery(t)
\ No newline at end of file
@@ -1,9 +1,389 @@
-from deep_translator import GoogleTranslator
-
-def translate_text(text, target_lang):
-    try:
-        # Translate from auto-detected source to target language
-        return GoogleTranslator(source='auto', target=target_lang).translate(text)
-    except Exception as e:
-        print(f"[Translation Error] {e}")
-        return text  # Fallback: return original text if translation fails
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from deep_translator import GoogleTranslator
+
+import metrics
+
+# === Translation Cache Settings ===
+CACHE_DB_NAME = os.environ.get("FARMIN_TRANSLATION_CACHE", "translation_cache.db")
+MEMORY_CACHE_SIZE = 4096                 # entries kept in the in-process LRU
+DISK_CACHE_TTL = 30 * 24 * 60 * 60       # seconds before a disk entry is re-fetched
+DISK_CACHE_MAX_ENTRIES = 50000           # oldest-accessed rows are evicted above this
+
+# === Batch Translation Settings ===
+BATCH_CHAR_LIMIT = 4500                  # provider rejects requests above 5000 chars
+BATCH_SEPARATOR = "\n"
+TRANSLATION_WORKERS = 4                  # max concurrent provider calls per process
+
+# === Offline Locale Catalogs (built by extract_locales.py) ===
+LOCALE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "locales")
+SOURCE_LANG = "en"
+
+_memory_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_stats = {"catalog_hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "errors": 0}
+_disk_ready = False
+_executor = None
+_catalogs = {}
+_source_messages = None
+
+TRANSLATE_SECONDS = metrics.histogram(
+    "farmin_translate_seconds", "translate_text latency, by whether a cache tier answered", ["cached"]
+)
+TRANSLATE_BATCH_SECONDS = metrics.histogram("farmin_translate_batch_seconds", "translate_many latency")
+
+
+def _connect():
+    conn = sqlite3.connect(CACHE_DB_NAME, timeout=5)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+def _init_disk_cache():
+    """Create the on-disk translation table if it doesn't exist."""
+    global _disk_ready
+    if _disk_ready:
+        return True
+    try:
+        conn = _connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS translations (
+                text TEXT NOT NULL,
+                source TEXT NOT NULL,
+                target TEXT NOT NULL,
+                translated TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (text, source, target)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_translations_accessed ON translations (accessed_at)")
+        conn.commit()
+        conn.close()
+        _disk_ready = True
+    except Exception as e:
+        print(f"[Translation Cache Error] {e}")
+    return _disk_ready
+
+
+def _memory_get(key):
+    with _cache_lock:
+        if key in _memory_cache:
+            _memory_cache.move_to_end(key)
+            return _memory_cache[key]
+    return None
+
+
+def _memory_put(key, value):
+    with _cache_lock:
+        _memory_cache[key] = value
+        _memory_cache.move_to_end(key)
+        while len(_memory_cache) > MEMORY_CACHE_SIZE:
+            _memory_cache.popitem(last=False)
+
+
+def _disk_get(key):
+    if not _init_disk_cache():
+        return None
+    try:
+        conn = _connect()
+        row = conn.execute(
+            "SELECT translated, created_at FROM translations WHERE text=? AND source=? AND target=?",
+            key
+        ).fetchone()
+        if row is None:
+            conn.close()
+            return None
+        translated, created_at = row
+        now = time.time()
+        if now - created_at > DISK_CACHE_TTL:
+            conn.execute("DELETE FROM translations WHERE text=? AND source=? AND target=?", key)
+            conn.commit()
+            conn.close()
+            return None
+        conn.execute(
+            "UPDATE translations SET accessed_at=? WHERE text=? AND source=? AND target=?",
+            (now,) + key
+        )
+        conn.commit()
+        conn.close()
+        return translated
+    except Exception as e:
+        print(f"[Translation Cache Error] {e}")
+        return None
+
+
+def _disk_put_many(items):
+    """Store (key, translated) pairs and evict the least recently used rows over the limit."""
+    if not items or not _init_disk_cache():
+        return
+    try:
+        now = time.time()
+        conn = _connect()
+        conn.executemany("""
+            INSERT OR REPLACE INTO translations (text, source, target, translated, created_at, accessed_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [key + (value, now, now) for key, value in items])
+        count = conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        if count > DISK_CACHE_MAX_ENTRIES:
+            conn.execute("""
+                DELETE FROM translations WHERE rowid IN (
+                    SELECT rowid FROM translations ORDER BY accessed_at ASC LIMIT ?
+                )
+            """, (count - DISK_CACHE_MAX_ENTRIES,))
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        print(f"[Translation Cache Error] {e}")
+
+
+def _load_json(path, default):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except Exception as e:
+        print(f"[Locale Catalog Error] {path}: {e}")
+        return default
+
+
+def get_catalog(lang):
+    """Load locales/<lang>.json once per process; missing catalogs are empty."""
+    global _source_messages
+    if lang not in _catalogs:
+        catalog = _load_json(os.path.join(LOCALE_DIR, f"{lang}.json"), {})
+        with _cache_lock:
+            _catalogs[lang] = catalog
+    if _source_messages is None:
+        messages = _load_json(os.path.join(LOCALE_DIR, "messages.json"), [])
+        _source_messages = frozenset(messages)
+    return _catalogs[lang]
+
+
+def _catalog_lookup(text, source_lang, target_lang):
+    """Resolve static UI text from the offline catalog without touching the network."""
+    if source_lang not in ("auto", SOURCE_LANG):
+        return None
+    catalog = get_catalog(target_lang)
+    if target_lang == SOURCE_LANG and text in _source_messages:
+        found = text
+    else:
+        found = catalog.get(text)
+    if found is not None:
+        with _cache_lock:
+            _cache_stats["catalog_hits"] += 1
+    return found
+
+
+def _cache_lookup(key):
+    """Check the locale catalog, the memory tier, then the disk tier (promoting disk hits to memory)."""
+    cached = _catalog_lookup(*key)
+    if cached is not None:
+        return cached
+    cached = _memory_get(key)
+    if cached is not None:
+        with _cache_lock:
+            _cache_stats["memory_hits"] += 1
+        return cached
+    cached = _disk_get(key)
+    if cached is not None:
+        _memory_put(key, cached)
+        with _cache_lock:
+            _cache_stats["disk_hits"] += 1
+        return cached
+    with _cache_lock:
+        _cache_stats["misses"] += 1
+    return None
+
+
+def get_cache_stats():
+    """Return hit/miss counters and the current memory tier size."""
+    with _cache_lock:
+        stats = dict(_cache_stats)
+        stats["memory_entries"] = len(_memory_cache)
+    hits = stats["catalog_hits"] + stats["memory_hits"] + stats["disk_hits"]
+    lookups = hits + stats["misses"]
+    stats["hit_rate"] = hits / lookups if lookups else 0.0
+    return stats
+
+
+def clear_translation_cache(disk=False):
+    """Drop the in-process cache (and optionally the on-disk store)."""
+    with _cache_lock:
+        _memory_cache.clear()
+        for k in _cache_stats:
+            _cache_stats[k] = 0
+    if disk and _init_disk_cache():
+        conn = _connect()
+        conn.execute("DELETE FROM translations")
+        conn.commit()
+        conn.close()
+
+
+def translate_text(text, target_lang, source_lang='auto'):
+    if not text or not str(text).strip():
+        return text
+
+    with TRANSLATE_SECONDS.time(cached="true") as labels:
+        key = (text, source_lang, target_lang)
+        cached = _cache_lookup(key)
+        if cached is not None:
+            return cached
+        labels["cached"] = "false"
+
+        try:
+            # Translate from auto-detected source to target language
+            translated = _provider_translate(text, source_lang, target_lang)
+        except Exception as e:
+            print(f"[Translation Error] {e}")
+            with _cache_lock:
+                _cache_stats["errors"] += 1
+            return text  # Fallback: return original text if translation fails
+
+        if not translated:
+            return text
+        _memory_put(key, translated)
+        _disk_put_many([(key, translated)])
+        return translated
+
+
+def _get_executor():
+    global _executor
+    with _cache_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=TRANSLATION_WORKERS, thread_name_prefix="translate")
+        return _executor
+
+
+def _provider_translate(text, source_lang, target_lang):
+    return GoogleTranslator(source=source_lang, target=target_lang).translate(text)
+
+
+def _pack_chunks(texts):
+    """Group single-line strings into newline-joined chunks under BATCH_CHAR_LIMIT."""
+    chunks, singles = [], []
+    current, size = [], 0
+    for text in texts:
+        if BATCH_SEPARATOR in text or len(text) >= BATCH_CHAR_LIMIT:
+            singles.append(text)
+            continue
+        if current and size + len(text) + 1 > BATCH_CHAR_LIMIT:
+            chunks.append(current)
+            current, size = [], 0
+        current.append(text)
+        size += len(text) + 1
+    if current:
+        chunks.append(current)
+    return chunks, singles
+
+
+def _translate_chunk(chunk, source_lang, target_lang):
+    """Translate a packed chunk in one call; returns None if the split doesn't line up."""
+    if len(chunk) == 1:
+        return [_provider_translate(chunk[0], source_lang, target_lang)]
+    joined = _provider_translate(BATCH_SEPARATOR.join(chunk), source_lang, target_lang)
+    parts = joined.split(BATCH_SEPARATOR) if joined else []
+    if len(parts) != len(chunk):
+        return None
+    return [p.strip() for p in parts]
+
+
+def _fetch_uncached(texts, source_lang, target_lang):
+    """Resolve cache misses with as few provider calls as possible."""
+    resolved = {}
+    executor = _get_executor()
+    chunks, singles = _pack_chunks(texts)
+
+    futures = {executor.submit(_translate_chunk, c, source_lang, target_lang): c for c in chunks}
+    for future, chunk in futures.items():
+        try:
+            parts = future.result()
+        except Exception as e:
+            print(f"[Translation Error] {e}")
+            parts = None
+        if parts is None:
+            # Provider merged or dropped lines; retry each string on its own
+            singles.extend(chunk)
+            continue
+        for text, part in zip(chunk, parts):
+            if part:
+                resolved[text] = part
+            else:
+                # An empty part is a bad split, not a translation; retry it alone
+                singles.append(text)
+
+    futures = {executor.submit(_provider_translate, s, source_lang, target_lang): s for s in singles}
+    for future, text in futures.items():
+        try:
+            translated = future.result()
+        except Exception as e:
+            print(f"[Translation Error] {e}")
+            with _cache_lock:
+                _cache_stats["errors"] += 1
+            continue
+        if translated:
+            resolved[text] = translated
+    return resolved
+
+
+@TRANSLATE_BATCH_SECONDS.timed()
+def translate_many(texts, target_lang, source_lang='auto'):
+    """
+    Translate a list of strings together. Duplicates and cached strings are
+    resolved locally; the rest are packed into as few provider calls as
+    possible and run on a bounded thread pool. Returns results in input order.
+    """
+    results = {}
+    pending = []
+    for text in dict.fromkeys(texts):
+        if not text or not str(text).strip():
+            results[text] = text
+            continue
+        cached = _cache_lookup((text, source_lang, target_lang))
+        if cached is not None:
+            results[text] = cached
+        else:
+            pending.append(text)
+
+    if pending:
+        fetched = _fetch_uncached(pending, source_lang, target_lang)
+        items = []
+        for text, translated in fetched.items():
+            if not translated:
+                continue  # never cache "" (same guard as translate_text)
+            key = (text, source_lang, target_lang)
+            _memory_put(key, translated)
+            items.append((key, translated))
+        _disk_put_many(items)
+        results.update((text, translated) for text, translated in fetched.items() if translated)
+
+    return [results.get(text, text) for text in texts]
+
+
+def page_translator(dest_lang, static_texts=()):
+    """
+    Build a page-level `t()` whose static strings are resolved up front in one
+    batch. Strings that weren't registered fall back to translate_text.
+    """
+    static_texts = list(static_texts)
+    resolved = dict(zip(static_texts, translate_many(static_texts, dest_lang)))
+
+    def t(text):
+        if text in resolved:
+            return resolved[text]
+        try:
+            return translate_text(text, dest_lang)
+        except Exception:
+            return text
+
+    return t
+
+
+metrics.register_stats("farmin_translation_cache", get_cache_stats)
@@ -1,15 +1,54 @@
 import streamlit as st
 import json
-from components.translator import translate_text
+from components.translator import page_translator, translate_many
 from components.feedback_button import feedback_button  # Add this import
 
 
+STATIC_TEXTS = [
+    "🌦️ Weather-Based Crop Planning",
+    "Plan your crops smartly with recent weather trends.",
+    "🏙️ Enter your district (e.g., Hyderabad, Warangal, Nizamabad)",
+    "Type a district name...",
+    "ℹ️ Please enter a district name to proceed.",
+    "❌ mock_weather.json file not found.",
+    "No data available for",
+    "Try: Hyderabad, Warangal, Nizamabad, etc.",
+    "Recent Weather Overview",
+    "Temperature",
+    "Humidity",
+    "Condition",
+    "Recommended Crops",
+    "Hot Climate",
+    "Moderate Climate",
+    "Cool Climate",
+]
+
+
+WEATHER_DATA_FILE = "mock_weather.json"
+FORECAST_BLOCKS = 5
+
+def load_weather_data(path=WEATHER_DATA_FILE):
+    with open(path) as f:
+        return json.load(f)
+
+def recent_forecast(all_data, city, blocks=FORECAST_BLOCKS):
+    """The first forecast blocks for a district, or None if it isn't covered."""
+    city = city.strip().lower()
+    if city not in all_data:
+        return None
+    return all_data[city]['list'][:blocks]
+
+def recommend_crops(forecast):
+    """(icon, climate label, crops) for the forecast's average temperature."""
+    avg_temp = sum([block['main']['temp'] for block in forecast]) / len(forecast)
+    if avg_temp > 30:
+        return "🌞", "Hot Climate", "Millets, Sorghum, Groundnut, Cotton"
+    elif 20 <= avg_temp <= 30:
+        return "🌤️", "Moderate Climate", "Rice, Soybean, Sugarcane, Tomato"
+    return "❄️", "Cool Climate", "Wheat, Barley, Mustard, Peas"
+
 def show(dest_lang='en'):
-    def t(text):
-        try:
-            return translate_text(text, dest_lang)
-        except:
-            return text
+    t = page_translator(dest_lang, STATIC_TEXTS)
 
     # Add the feedback button at the top
     feedback_button("Weather-Based Crop Planning")
@@ -18,8 +57,8 @@ def show(dest_lang='en'):
     st.markdown(
         f"""
         <div style='text-align: center; padding-bottom: 10px;'>
-            <h2 style='color:#00796B;'>{translate_text("🌦️ Weather-Based Crop Planning", dest_lang)}</h2>
-            <p style='color: gray;'>{translate_text("Plan your crops smartly with recent weather trends.", dest_lang)}</p>
+            <h2 style='color:#00796B;'>{t("🌦️ Weather-Based Crop Planning")}</h2>
+            <p style='color: gray;'>{t("Plan your crops smartly with recent weather trends.")}</p>
         </div>
         """,
         unsafe_allow_html=True
@@ -29,60 +68,56 @@ def show(dest_lang='en'):
 
     # District input
     city = st.text_input(
-        translate_text("🏙️ Enter your district (e.g., Hyderabad, Warangal, Nizamabad)", dest_lang),
-        placeholder=translate_text("Type a district name...", dest_lang)
+        t("🏙️ Enter your district (e.g., Hyderabad, Warangal, Nizamabad)"),
+        placeholder=t("Type a district name...")
     ).strip().lower()
 
     if not city:
-        st.info(translate_text("ℹ️ Please enter a district name to proceed.", dest_lang))
+        st.info(t("ℹ️ Please enter a district name to proceed."))
         return
 
     # Load mock weather data
     try:
-        with open("mock_weather.json") as f:
-            all_data = json.load(f)
+        all_data = load_weather_data()
     except FileNotFoundError:
-        st.error(translate_text("❌ mock_weather.json file not found.", dest_lang))
+        st.error(t("❌ mock_weather.json file not found."))
         return
 
-    if city not in all_data:
+    forecast = recent_forecast(all_data, city)
+    if forecast is None:
         st.warning(
-            f"⚠️ {translate_text('No data available for', dest_lang)} '{city.title()}'.<br>"
-            f"{translate_text('Try: Hyderabad, Warangal, Nizamabad, etc.', dest_lang)}",
+            f"⚠️ {t('No data available for')} '{city.title()}'.<br>"
+            f"{t('Try: Hyderabad, Warangal, Nizamabad, etc.')}",
             unsafe_allow_html=True
         )
         return
 
-    forecast = all_data[city]['list'][:5]
+    # Resolve all forecast descriptions in one batch instead of per block
+    descriptions = [block['weather'][0]['description'] for block in forecast]
+    translated_descriptions = translate_many(descriptions, dest_lang)
 
-    st.markdown("### 🌤️ " + translate_text("Recent Weather Overview", dest_lang) + f" - {city.title()}")
+    st.markdown("### 🌤️ " + t("Recent Weather Overview") + f" - {city.title()}")
     with st.container():
-        for block in forecast:
+        for block, weather in zip(forecast, translated_descriptions):
             temp = block['main']['temp']
             humidity = block['main']['humidity']
-            weather = block['weather'][0]['description']
             st.markdown(
                 f"""
                 <div style='background-color: #1e1e1e; padding: 10px; border-radius: 10px; margin-bottom: 10px;'>
-                    🌡️ <b>{translate_text('Temperature', dest_lang)}:</b> {temp}°C &nbsp;&nbsp;
-                    💧 <b>{translate_text('Humidity', dest_lang)}:</b> {humidity}% &nbsp;&nbsp;
-                    🌤️ <b>{translate_text('Condition', dest_lang)}:</b> {translate_text(weather, dest_lang)}
+                    🌡️ <b>{t('Temperature')}:</b> {temp}°C &nbsp;&nbsp;
+                    💧 <b>{t('Humidity')}:</b> {humidity}% &nbsp;&nbsp;
+                    🌤️ <b>{t('Condition')}:</b> {weather}
                 </div>
                 """,
                 unsafe_allow_html=True
             )
 
-    avg_temp = sum([block['main']['temp'] for block in forecast]) / len(forecast)
+    icon, climate, crops = recommend_crops(forecast)
 
-    st.markdown("### 🌱 " + translate_text("Recommended Crops", dest_lang))
+    st.markdown("### 🌱 " + t("Recommended Crops"))
 
     with st.container():
-        if avg_temp > 30:
-            st.success("**🌞 " + translate_text("Hot Climate", dest_lang) + ":** Millets, Sorghum, Groundnut, Cotton")
-        elif 20 <= avg_temp <= 30:
-            st.success("**🌤️ " + translate_text("Moderate Climate", dest_lang) + ":** Rice, Soybean, Sugarcane, Tomato")
-        else:
-            st.success("**❄️ " + translate_text("Cool Climate", dest_lang) + ":** Wheat, Barley, Mustard, Peas")
+        st.success(f"**{icon} " + t(climate) + f":** {crops}")
 
     # Footer spacing
     st.markdown("<br><br>", unsafe_allow_html=True)
@@ -1,99 +1,444 @@
+import os
 import sqlite3
+import threading
+from contextlib import contextmanager
 
-DB_NAME = "farmer_data.db"
+import metrics
+from image_store import ImageStore, make_thumbnail
+
+# Tables are created (and migrated) in this database as soon as db is imported
+DB_NAME = os.environ.get("FARMIN_DB", "farmer_data.db")
+
+DB_QUERY_SECONDS = metrics.histogram("farmin_db_query_seconds", "db.py call latency", ["query"])
+
+# === Connection Settings ===
+BUSY_TIMEOUT_MS = 5000              # writers wait for the lock instead of failing with "database is locked"
+CACHE_SIZE_KB = 16 * 1024           # page cache per connection
+MMAP_SIZE = 128 * 1024 * 1024       # memory-mapped reads
+
+_local = threading.local()
+
+def _open_connection(path):
+    # Autocommit mode: single statements commit on their own, and
+    # transaction() issues an explicit BEGIN for multi-statement work
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")          # readers don't block the writer
+    conn.execute("PRAGMA synchronous=NORMAL")        # safe with WAL, far fewer fsyncs
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+def get_connection():
+    """
+    Connection reused by every db call on the current thread. It is
+    reopened if DB_NAME changes and closed when the thread exits.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.path != DB_NAME:
+        if conn is not None:
+            conn.close()
+        conn = _open_connection(DB_NAME)
+        _local.conn, _local.path, _local.depth = conn, DB_NAME, 0
+    return conn
+
+def close_connection():
+    """Close the current thread's connection (it is reopened on next use)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+@contextmanager
+def transaction():
+    """
+    Run several statements as one write transaction that commits once:
+
+        with transaction() as conn:
+            conn.execute(...)
+            conn.execute(...)
+
+    BEGIN IMMEDIATE takes the write lock up front, so two writers never
+    deadlock upgrading from a read lock. Nested blocks join the outer
+    transaction.
+    """
+    conn = get_connection()
+    if _local.depth:
+        _local.depth += 1
+        try:
+            yield conn
+        finally:
+            _local.depth -= 1
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    _local.depth = 1
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    else:
+        conn.commit()
+    finally:
+        _local.depth = 0
 
 # === General Record Table ===
 def create_table():
     """Create general records table if it doesn't exist."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS records (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            record_type TEXT NOT NULL,
-            detail TEXT NOT NULL,
-            date TEXT NOT NULL
-        )
-    """)
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS records (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                record_type TEXT NOT NULL,
+                detail TEXT NOT NULL,
+                date TEXT NOT NULL
+            )
+        """)
+        # Filter + sort paths for query_records; SQLite appends the rowid (id) to each index
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_records_type_date ON records (record_type, date)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_records_date ON records (date)")
 
+@DB_QUERY_SECONDS.timed(query="add_record")
 def add_record(record_type, detail, date):
     """Add a new record to the records table."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO records (record_type, detail, date)
-        VALUES (?, ?, ?)
-    """, (record_type, detail, date))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.execute("""
+            INSERT INTO records (record_type, detail, date)
+            VALUES (?, ?, ?)
+        """, (record_type, detail, date))
 
+@DB_QUERY_SECONDS.timed(query="get_records")
 def get_records():
     """Fetch all records from the records table."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM records ORDER BY id DESC")
-    records = cursor.fetchall()
-    conn.close()
-    return records
+    return get_connection().execute("SELECT * FROM records ORDER BY id DESC").fetchall()
+
+RECORDS_PAGE_SIZE = 25
+
+@DB_QUERY_SECONDS.timed(query="query_records")
+def query_records(record_type=None, date_from=None, date_to=None, after=None, before=None,
+                  limit=RECORDS_PAGE_SIZE):
+    """
+    One page of records, newest first (date, then id), using keyset pagination
+    so deep pages cost the same as the first one.
+
+    `after` is the (date, id) of the last row on the current page (next page);
+    `before` is the (date, id) of its first row (previous page). Dates are
+    ISO strings and the range is inclusive. Returns (rows, has_more), where
+    has_more says whether another page exists in the direction travelled.
+    """
+    date_from = str(date_from) if date_from else None
+    date_to = str(date_to) if date_to else None
+    # Fold the cursor into the date range, so the index is searched with a
+    # single pair of bounds instead of scanning from the wider one
+    if after:
+        date_to = min(date_to, after[0]) if date_to else after[0]
+    elif before:
+        date_from = max(date_from, before[0]) if date_from else before[0]
+
+    where, params = [], []
+    if record_type:
+        where.append("record_type = ?")
+        params.append(record_type)
+    if date_from:
+        where.append("date >= ?")
+        params.append(date_from)
+    if date_to:
+        where.append("date <= ?")
+        params.append(date_to)
+    if after:
+        where.append("(date < ? OR id < ?)")
+        params += [after[0], after[1]]
+        order = "date DESC, id DESC"
+    elif before:
+        where.append("(date > ? OR id > ?)")
+        params += [before[0], before[1]]
+        order = "date ASC, id ASC"
+    else:
+        order = "date DESC, id DESC"
+
+    sql = "SELECT id, record_type, detail, date FROM records"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {order} LIMIT ?"
+    rows = get_connection().execute(sql, params + [limit + 1]).fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if before:
+        rows.reverse()
+    return rows, has_more
+
+def page_cursor(row):
+    """Keyset cursor (date, id) for a row returned by query_records."""
+    return row[3], row[0]
+
+# === Bulk Import / Export ===
+EXPORT_CHUNK_SIZE = 1000
+
+@DB_QUERY_SECONDS.timed(query="bulk_insert_records")
+def bulk_insert_records(rows, batch_size=EXPORT_CHUNK_SIZE):
+    """
+    Insert an iterable of (record_type, detail, date) tuples in one
+    transaction, with executemany per batch so a large import never sits
+    in memory at once. Returns the number of rows inserted.
+    """
+    return _bulk_insert(
+        "INSERT INTO records (record_type, detail, date) VALUES (?, ?, ?)", rows, batch_size
+    )
+
+@DB_QUERY_SECONDS.timed(query="bulk_insert_image_metadata")
+def bulk_insert_image_metadata(rows, batch_size=EXPORT_CHUNK_SIZE):
+    """
+    Insert (name, category, description, image_hash, mime_type, size_bytes)
+    rows for files already in the image store, in one transaction.
+    """
+    return _bulk_insert('''
+        INSERT INTO disease_images (name, category, description, image_hash, mime_type, size_bytes)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', rows, batch_size)
+
+def _bulk_insert(sql, rows, batch_size):
+    inserted = 0
+    batch = []
+    with transaction() as conn:
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                conn.executemany(sql, batch)
+                inserted += len(batch)
+                batch = []
+        if batch:
+            conn.executemany(sql, batch)
+            inserted += len(batch)
+    return inserted
+
+def iter_records(chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield lists of (id, record_type, detail, date) rows, oldest first, chunk_size at a time."""
+    return _iter_chunks("SELECT id, record_type, detail, date FROM records ORDER BY id", chunk_size)
+
+def iter_image_metadata(chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield lists of image metadata rows (no image bytes), chunk_size at a time."""
+    return _iter_chunks('''
+        SELECT id, name, category, description, image_hash, mime_type, size_bytes
+        FROM disease_images ORDER BY id
+    ''', chunk_size)
+
+def _iter_chunks(sql, chunk_size):
+    # fetchmany keeps one chunk in memory; under WAL the cursor reads a
+    # stable snapshot while other threads keep writing
+    cursor = get_connection().execute(sql)
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield rows
+    finally:
+        cursor.close()
 
 # === Disease Image Table ===
+# Image bytes live in the content-addressed file store; rows keep the hash
+image_store = ImageStore()
+
+# PRAGMA user_version once thumbnails exist for every stored image
+THUMBNAILS_SCHEMA_VERSION = 1
+IMAGES_PAGE_SIZE = 12
+
 def create_image_table():
     """Create disease_images table for storing crop/cattle disease images."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS disease_images (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            category TEXT CHECK(category IN ('crop', 'cattle')) NOT NULL,
-            description TEXT,
-            image BLOB NOT NULL
-        )
-    ''')
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS disease_images (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                category TEXT CHECK(category IN ('crop', 'cattle')) NOT NULL,
+                description TEXT,
+                image_hash TEXT NOT NULL,
+                mime_type TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL
+            )
+        ''')
+    migrate_image_blobs()
+    conn = get_connection()
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_disease_images_hash ON disease_images (image_hash)')
+    # One-off backfill for images stored before thumbnails; new ones get theirs at ingest
+    if conn.execute('PRAGMA user_version').fetchone()[0] < THUMBNAILS_SCHEMA_VERSION:
+        backfill_thumbnails()
+        conn.execute(f'PRAGMA user_version = {THUMBNAILS_SCHEMA_VERSION}')
+
+def migrate_image_blobs():
+    """
+    Move images stored as BLOBs (the old schema) into the file store and
+    rebuild the table without the BLOB column. Returns the number of rows moved.
+    """
+    conn = get_connection()
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(disease_images)')}
+    if "image" not in columns:
+        return 0
+    moved = 0
+    with transaction() as conn:
+        conn.execute('''
+            CREATE TABLE disease_images_new (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                category TEXT CHECK(category IN ('crop', 'cattle')) NOT NULL,
+                description TEXT,
+                image_hash TEXT NOT NULL,
+                mime_type TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL
+            )
+        ''')
+        rows = conn.execute('SELECT id, name, category, description, image FROM disease_images')
+        for image_id, name, category, description, blob in rows:
+            digest, mime = image_store.put(blob)
+            conn.execute('''
+                INSERT INTO disease_images_new (id, name, category, description, image_hash, mime_type, size_bytes)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (image_id, name, category, description, digest, mime, len(blob)))
+            moved += 1
+        conn.execute('DROP TABLE disease_images')
+        conn.execute('ALTER TABLE disease_images_new RENAME TO disease_images')
+    # Give the BLOB pages back to the filesystem
+    conn.execute('VACUUM')
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    if moved:
+        print(f"📦 Moved {moved} disease image(s) from the database to {image_store.root}/")
+    return moved
+
+HASH_LOOKUP_BATCH = 500            # stays under SQLite's bound-parameter limit
+
+def _images_to_thumbnail(digests):
+    """(image_hash, mime_type) rows, for all images or only the given hashes (looked up by index)."""
+    conn = get_connection()
+    if digests is None:
+        return conn.execute('SELECT DISTINCT image_hash, mime_type FROM disease_images').fetchall()
+    digests = sorted(set(digests))
+    rows = []
+    for i in range(0, len(digests), HASH_LOOKUP_BATCH):
+        batch = digests[i:i + HASH_LOOKUP_BATCH]
+        rows += conn.execute(
+            f'SELECT DISTINCT image_hash, mime_type FROM disease_images '
+            f'WHERE image_hash IN ({",".join("?" * len(batch))})', batch
+        ).fetchall()
+    return rows
+
+def backfill_thumbnails(digests=None):
+    """
+    Make the missing WebP thumbnails for stored images, or only for the given
+    image hashes. Returns the number made.
+    """
+    rows = _images_to_thumbnail(digests)
+    made = 0
+    for digest, mime in rows:
+        if os.path.exists(image_store.thumbnail_path(digest)):
+            continue
+        try:
+            thumbnail = make_thumbnail(image_store.read(digest, mime))
+        except FileNotFoundError:
+            continue
+        if thumbnail is None:
+            continue
+        with transaction() as conn:
+            # Skip images deleted while the thumbnail was being made
+            if conn.execute('SELECT 1 FROM disease_images WHERE image_hash=? LIMIT 1', (digest,)).fetchone():
+                image_store.put_thumbnail(digest, thumbnail)
+                made += 1
+    if made:
+        print(f"🖼️ Made {made} missing thumbnail(s) in {image_store.root}/thumbs/")
+    return made
+
+@DB_QUERY_SECONDS.timed(query="insert_image")
+def insert_image_bytes(name, category, description, image_data):
+    """Store the image file (deduplicated by content) and its thumbnail, and insert its metadata row."""
+    # Resize before taking the write lock; it's the slow part
+    thumbnail = make_thumbnail(image_data)
+    with transaction() as conn:
+        # Written under the write lock, so a concurrent delete_image can't remove it in between
+        digest, mime = image_store.put(image_data)
+        if thumbnail is not None:
+            image_store.put_thumbnail(digest, thumbnail)
+        cur = conn.execute('''
+            INSERT INTO disease_images (name, category, description, image_hash, mime_type, size_bytes)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (name, category, description, digest, mime, len(image_data)))
+    return cur.lastrowid
 
 def insert_image(name, category, description, image_path):
     """Insert a new disease image into the database."""
     with open(image_path, 'rb') as file:
         image_data = file.read()
+    return insert_image_bytes(name, category, description, image_data)
 
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO disease_images (name, category, description, image)
-        VALUES (?, ?, ?, ?)
-    ''', (name, category, description, image_data))
-    conn.commit()
-    conn.close()
-
+@DB_QUERY_SECONDS.timed(query="get_image_by_id")
 def get_image_by_id(image_id):
-    """Retrieve a specific image entry by ID."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute('SELECT name, category, description, image FROM disease_images WHERE id=?', (image_id,))
-    result = cursor.fetchone()
-    conn.close()
-    return result
+    """Retrieve a specific image entry by ID, with the image bytes."""
+    row = get_connection().execute(
+        'SELECT name, category, description, image_hash, mime_type FROM disease_images WHERE id=?', (image_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    name, category, description, digest, mime = row
+    return name, category, description, image_store.read(digest, mime)
 
+@DB_QUERY_SECONDS.timed(query="list_all_images")
 def list_all_images():
     """List metadata of all stored disease images."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute('SELECT id, name, category, description FROM disease_images ORDER BY id DESC')
-    results = cursor.fetchall()
-    conn.close()
-    return results
+    return get_connection().execute(
+        'SELECT id, name, category, description FROM disease_images ORDER BY id DESC'
+    ).fetchall()
+
+def _with_files(row):
+    image_id, name, category, description, digest, mime = row
+    thumbnail_path = image_store.thumbnail_path(digest)
+    return (image_id, name, category, description, image_store.path_for(digest, mime),
+            thumbnail_path if os.path.exists(thumbnail_path) else None)
+
+@DB_QUERY_SECONDS.timed(query="query_images")
+def query_images(after=None, before=None, limit=IMAGES_PAGE_SIZE):
+    """
+    One gallery page of images, newest first, with keyset pagination on id
+    (`after`/`before` are the ids of the current page's last/first rows, as
+    in query_records). Rows are (id, name, category, description, path,
+    thumbnail_path); files are checked only for the returned rows and
+    thumbnail_path is None if the image has no thumbnail. Returns (rows, has_more).
+    """
+    sql = 'SELECT id, name, category, description, image_hash, mime_type FROM disease_images'
+    params = []
+    if after is not None:
+        sql += ' WHERE id < ? ORDER BY id DESC'
+        params.append(after)
+    elif before is not None:
+        sql += ' WHERE id > ? ORDER BY id ASC'
+        params.append(before)
+    else:
+        sql += ' ORDER BY id DESC'
+    rows = get_connection().execute(sql + ' LIMIT ?', params + [limit + 1]).fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if before is not None:
+        rows.reverse()
+    return [_with_files(row) for row in rows], has_more
+
+@DB_QUERY_SECONDS.timed(query="get_image_entry")
+def get_image_entry(image_id):
+    """(id, name, category, description, path, thumbnail_path) for one image, or None."""
+    row = get_connection().execute(
+        'SELECT id, name, category, description, image_hash, mime_type FROM disease_images WHERE id=?', (image_id,)
+    ).fetchone()
+    return _with_files(row) if row else None
 
+@DB_QUERY_SECONDS.timed(query="delete_image")
 def delete_image(image_id):
-    """Delete a disease image entry by ID."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute('DELETE FROM disease_images WHERE id=?', (image_id,))
-    conn.commit()
-    conn.close()
+    """Delete a disease image entry by ID (and its file, once no other entry uses it)."""
+    with transaction() as conn:
+        row = conn.execute('SELECT image_hash, mime_type FROM disease_images WHERE id=?', (image_id,)).fetchone()
+        conn.execute('DELETE FROM disease_images WHERE id=?', (image_id,))
+        if row is None:
+            return
+        digest, mime = row
+        still_used = conn.execute('SELECT 1 FROM disease_images WHERE image_hash=? LIMIT 1', (digest,)).fetchone()
+        if not still_used:
+            image_store.delete(digest, mime)
 
 # Initialize tables
 create_table()
@@ -1,72 +1,380 @@
-import tensorflow as tf
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing import image
 import numpy as np
 from PIL import Image
 import io
 import os
+import gc
+import threading
+import time
+from collections import OrderedDict
+from inference_service import BatchingInferenceService
+from prediction_cache import PredictionCache, file_version
+import metrics
+
+# Model files per detection type; loaded lazily by the registry below
+MODEL_PATHS = {
+    "poultry": "models/poultry_disease_model.h5",
+    "crop": "models/crop_disease_model.h5",
+    "cow": "models/cow_disease_model.h5",
+}
+
+# Resident budget for loaded models in MB (0 = unlimited)
+MODEL_MEMORY_BUDGET_MB = float(os.environ.get("FARMIN_MODEL_BUDGET_MB", "0"))
+
+# After a failed load, wait this long before trying the same file again
+MODEL_RETRY_SECONDS = float(os.environ.get("FARMIN_MODEL_RETRY_SECONDS", "60"))
+
+# Serving backend: "keras" (the .h5 files) or "tflite" (artifacts from export_tflite.py)
+MODEL_BACKEND = os.environ.get("FARMIN_MODEL_BACKEND", "keras").lower()
+TFLITE_QUANTIZATION = os.environ.get("FARMIN_TFLITE_QUANT", "float16")
+
+def tflite_path(keras_path, quantization=TFLITE_QUANTIZATION):
+    """models/x.h5 -> models/x.<quantization>.tflite"""
+    return f"{os.path.splitext(keras_path)[0]}.{quantization}.tflite"
+
+def _make_interpreter(path):
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    return Interpreter(model_path=path)
+
+class TFLiteModel:
+    """Minimal predict()-compatible wrapper around a TFLite interpreter."""
+
+    def __init__(self, path):
+        self.path = path
+        self.size_bytes = os.path.getsize(path)
+        self._interpreter = _make_interpreter(path)
+        self._interpreter.allocate_tensors()
+        self._input = self._interpreter.get_input_details()[0]
+        self._output = self._interpreter.get_output_details()[0]
+        self._lock = threading.Lock()
+
+    def _quantize_input(self, x):
+        dtype = self._input["dtype"]
+        if np.issubdtype(dtype, np.integer):
+            scale, zero_point = self._input["quantization"]
+            # Saturate values outside the calibrated range instead of wrapping around
+            info = np.iinfo(dtype)
+            x = np.clip(np.round(x / scale + zero_point), info.min, info.max)
+        return x.astype(dtype)
+
+    def _dequantize_output(self, y):
+        if np.issubdtype(y.dtype, np.integer):
+            scale, zero_point = self._output["quantization"]
+            y = (y.astype(np.float32) - zero_point) * scale
+        return y
+
+    def predict(self, x, verbose=0):
+        x = np.asarray(x)
+        with self._lock:
+            if tuple(self._input["shape"]) != x.shape:
+                self._interpreter.resize_tensor_input(self._input["index"], x.shape)
+                self._interpreter.allocate_tensors()
+                self._input = self._interpreter.get_input_details()[0]
+                self._output = self._interpreter.get_output_details()[0]
+            self._interpreter.set_tensor(self._input["index"], self._quantize_input(x))
+            self._interpreter.invoke()
+            y = self._interpreter.get_tensor(self._output["index"]).copy()
+        return self._dequantize_output(y)
+
+def load_model_file(path):
+    """Load a Keras or TFLite model; raises if the file is missing or unreadable."""
+    if path.endswith(".tflite"):
+        return TFLiteModel(path)
+    # TensorFlow is imported here so app start-up doesn't pay for it
+    from tensorflow.keras.models import load_model
+    return load_model(path)
 
 # Helper to safely load a model
 def safe_load_model(path):
     try:
-        return load_model(path)
+        return load_model_file(path)
     except Exception as e:
         print(f"❌ Failed to load model at {path}: {e}")
         return None
 
-# Load models
-poultry_model = safe_load_model("models/poultry_disease_model.h5")
-crop_model = safe_load_model("models/crop_disease_model.h5")
-cow_model = safe_load_model("models/cow_disease_model.h5")
+def serving_paths(backend=MODEL_BACKEND):
+    """Model file per detection type for the selected backend."""
+    if backend == "tflite":
+        return {name: tflite_path(path) for name, path in MODEL_PATHS.items()}
+    return dict(MODEL_PATHS)
+
+def _rss_bytes():
+    """Current resident set size of this process (Linux), or 0 if unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return 0
+
+def _model_size_bytes(model):
+    """Bytes held by the model's weights; stable across platforms, unlike RSS deltas."""
+    if hasattr(model, "size_bytes"):
+        return model.size_bytes
+    try:
+        return int(sum(w.nbytes for w in model.get_weights()))
+    except Exception:
+        return 0
+
+class ModelRegistry:
+    """
+    Process-wide, thread-safe cache of the disease models. Each model is
+    loaded on first use and shared by every Streamlit session; when the
+    memory budget is exceeded, the least recently used models are dropped.
+    A failed load is remembered for retry_seconds (or until the file
+    changes), so a missing or corrupt model isn't reloaded on every call.
+    """
+
+    def __init__(self, paths, budget_mb=0, loader=load_model_file, retry_seconds=MODEL_RETRY_SECONDS):
+        self.paths = dict(paths)
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self.loader = loader
+        self.retry_seconds = retry_seconds
+        self._models = OrderedDict()
+        self._info = {}
+        self._failures = {}
+        self._lock = threading.Lock()
+        self._load_locks = {name: threading.Lock() for name in self.paths}
+
+    def get(self, name):
+        """Return the loaded model for `name`, loading it if needed (None on failure)."""
+        if name not in self.paths:
+            return None
+        version = file_version(self.paths[name])
+        with self._lock:
+            if name in self._models and self._info[name]["version"] != version:
+                # Model file was replaced on disk; reload it on this call
+                del self._models[name]
+                self._info.pop(name, None)
+            if name in self._models:
+                self._models.move_to_end(name)
+                self._info[name]["last_used"] = time.time()
+                self._info[name]["uses"] += 1
+                return self._models[name]
+            if self._failure_pending(name, version):
+                return None
+
+        # Per-model lock so two sessions don't load the same file twice
+        with self._load_locks[name]:
+            with self._lock:
+                if name in self._models:
+                    return self._models[name]
+                if self._failure_pending(name, version):
+                    return None
+            rss_before = _rss_bytes()
+            start = time.perf_counter()
+            try:
+                model = self.loader(self.paths[name])
+                if model is None:
+                    raise ValueError("loader returned no model")
+            except Exception as e:
+                with self._lock:
+                    self._failures[name] = {
+                        "error": str(e) or type(e).__name__,
+                        "version": version,
+                        "retry_at": time.time() + self.retry_seconds,
+                    }
+                print(f"❌ Failed to load {name} model at {self.paths[name]}: {e} "
+                      f"(retrying in {self.retry_seconds:.0f}s or when the file changes)")
+                return None
+            load_seconds = time.perf_counter() - start
+            size = _model_size_bytes(model)
+            with self._lock:
+                self._failures.pop(name, None)
+                self._models[name] = model
+                self._info[name] = {
+                    "path": self.paths[name],
+                    "version": version,
+                    "load_seconds": round(load_seconds, 3),
+                    "size_bytes": size,
+                    "rss_delta_bytes": max(_rss_bytes() - rss_before, 0),
+                    "loaded_at": time.time(),
+                    "last_used": time.time(),
+                    "uses": 1,
+                }
+                self._evict_over_budget(keep=name)
+            print(f"✅ Loaded {name} model in {load_seconds:.2f}s ({size / 1e6:.1f} MB)")
+            return model
+
+    def _failure_pending(self, name, version):
+        """True while a cached load failure still applies (same file, before retry_at)."""
+        failure = self._failures.get(name)
+        return bool(failure) and failure["version"] == version and time.time() < failure["retry_at"]
+
+    def last_error(self, name):
+        """Why the last load of `name` failed, or None if it didn't."""
+        with self._lock:
+            failure = self._failures.get(name)
+            return failure["error"] if failure else None
+
+    def _evict_over_budget(self, keep):
+        if not self.budget_bytes:
+            return
+        evicted = []
+        while self.resident_bytes() > self.budget_bytes:
+            victim = next((n for n in self._models if n != keep), None)
+            if victim is None:
+                break
+            del self._models[victim]
+            self._info.pop(victim, None)
+            evicted.append(victim)
+        if evicted:
+            gc.collect()
+            print(f"♻️ Evicted models over budget: {', '.join(evicted)}")
+
+    def resident_bytes(self):
+        return sum(self._info[n]["size_bytes"] for n in self._models)
+
+    def unload(self, name):
+        with self._lock:
+            self._models.pop(name, None)
+            self._info.pop(name, None)
+        gc.collect()
+
+    def stats(self):
+        """Load time, size and usage for each resident model."""
+        with self._lock:
+            return {
+                "budget_bytes": self.budget_bytes,
+                "resident_bytes": self.resident_bytes(),
+                "models": {n: dict(self._info[n]) for n in self._models},
+                "failed": {n: dict(f) for n, f in self._failures.items()},
+            }
+
+model_registry = ModelRegistry(serving_paths(), budget_mb=MODEL_MEMORY_BUDGET_MB)
+
+# Concurrent predictions for the same model are batched into one forward pass
+inference_service = BatchingInferenceService(model_registry.get)
 
 # Class names (update if your model classes differ)
 poultry_classes = ["Healthy", "Avian Influenza", "Newcastle Disease", "Coccidiosis"]
 crop_classes = ['Corn', 'Potato', 'Rice', 'Wheat', 'sugarcane']
 cow_classes = ["foot infected", "healthy cow", "healthy_cow_mouth", "lumpy skin", "mouth infected"]
 
-def preprocess_image(img_bytes):
-    """Preprocess image for prediction."""
-    img = Image.open(io.BytesIO(img_bytes)).convert("RGB")
-    img = img.resize((224, 224))  # Change based on model input
-    img_array = image.img_to_array(img)
-    img_array = np.expand_dims(img_array, axis=0)
-    img_array = img_array / 255.0
-    return img_array
+MODEL_CLASSES = {
+    "poultry": poultry_classes,
+    "crop": crop_classes,
+    "cow": cow_classes,
+}
 
-def predict_disease(uploaded_file, model_type="poultry"):
+# Model input size and upload limits
+INPUT_SIZE = (224, 224)  # Change based on model input
+MAX_UPLOAD_BYTES = 20 * 1024 * 1024
+MAX_IMAGE_PIXELS = 40_000_000  # ~40 MP; anything larger is treated as a decompression bomb
+
+def _load_rgb(img_bytes, size=INPUT_SIZE):
+    """Decode just enough of the upload to produce an RGB image of `size`."""
+    if len(img_bytes) > MAX_UPLOAD_BYTES:
+        raise ValueError(f"image is larger than {MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+    # Only the header is read here; the size check below rejects anything
+    # past MAX_IMAGE_PIXELS before a single pixel is decoded
+    try:
+        img = Image.open(io.BytesIO(img_bytes))
+    except Image.DecompressionBombError as e:
+        raise ValueError(f"image dimensions are too large: {e}")
+    width, height = img.size
+    if width * height > MAX_IMAGE_PIXELS:
+        raise ValueError(f"image dimensions {width}x{height} are too large")
+    # JPEG only: let libjpeg decode at 1/2, 1/4 or 1/8 scale, never below `size`
+    img.draft("RGB", size)
+    img = img.convert("RGB")
+    if img.size != size:
+        img = img.resize(size, Image.BICUBIC, reducing_gap=2.0)
+    return img
+
+def preprocess_image(img_bytes, out=None):
     """
-    Predict disease from an uploaded image.
+    Preprocess image for prediction: a (1, 224, 224, 3) float32 array in [0, 1].
+    Writes into `out` when given, otherwise allocates exactly one array.
     """
-    try:
-        img_bytes = uploaded_file.read()
-        img_array = preprocess_image(img_bytes)
-        print("✅ Image shape:", img_array.shape)
+    img = _load_rgb(img_bytes)
+    if out is None:
+        out = np.empty((1, INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=np.float32)
+    np.multiply(np.asarray(img), np.float32(1.0 / 255.0), out=out[0], casting="unsafe")
+    return out
 
-        if model_type == "poultry" and poultry_model:
-            predictions = poultry_model.predict(img_array)
-            classes = poultry_classes
-        elif model_type == "crop" and crop_model:
-            predictions = crop_model.predict(img_array)
-            classes = crop_classes
-        elif model_type == "cow" and cow_model:
-            predictions = cow_model.predict(img_array)
-            classes = cow_classes
-        else:
-            return f"❌ Invalid model type or model not loaded: {model_type}"
+def preprocess_batch(images, out=None):
+    """Preprocess many uploads into one preallocated (N, 224, 224, 3) float32 buffer."""
+    if out is None:
+        out = np.empty((len(images), INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=np.float32)
+    elif out.shape[0] < len(images):
+        raise ValueError(f"buffer holds {out.shape[0]} images, got {len(images)}")
+    for i, img_bytes in enumerate(images):
+        preprocess_image(img_bytes, out=out[i:i + 1])
+    return out[:len(images)]
 
-        print("🔍 Predictions:", predictions)
+# Repeat uploads of the same photo are served without running the model
+prediction_cache = PredictionCache()
 
-        if predictions.shape[1] != len(classes):
-            return f"⚠ Mismatch: Model returned {predictions.shape[1]} classes, but expected {len(classes)}"
+PREDICTION_SECONDS = metrics.histogram(
+    "farmin_prediction_seconds", "predict_disease latency", ["model_type", "cached"]
+)
+metrics.register_stats("farmin_prediction_cache", prediction_cache.stats)
+metrics.register_stats("farmin_model_registry", model_registry.stats)
+metrics.register_stats("farmin_inference", inference_service.stats, label="model")
 
-        predicted_index = np.argmax(predictions[0])
-        if predicted_index >= len(classes):
-            return f"⚠ Predicted index {predicted_index} is out of range for class list"
+def model_version(model_type):
+    """Version tag of the model file currently served for `model_type`."""
+    path = model_registry.paths.get(model_type)
+    return file_version(path) if path else None
 
-        predicted_class = classes[predicted_index]
-        confidence = float(np.max(predictions)) * 100
+def _predict_bytes(img_bytes, model_type):
+    """Run the model; returns (result text, True) or (error text, False)."""
+    img_array = preprocess_image(img_bytes)
+    print("✅ Image shape:", img_array.shape)
 
-        return f"{predicted_class} ({confidence:.2f}%)"
+    model = model_registry.get(model_type)
+    if model is None:
+        error = model_registry.last_error(model_type)
+        if error:
+            return f"❌ The {model_type} model could not be loaded: {error}", False
+        return f"❌ Invalid model type or model not loaded: {model_type}", False
+    predictions = inference_service.predict(model_type, img_array, timeout=120)
+    classes = MODEL_CLASSES[model_type]
 
-    except Exception as e:
-        return f"⚠ Error during prediction: {e}"
+    print("🔍 Predictions:", predictions)
+
+    if predictions.shape[1] != len(classes):
+        return f"⚠ Mismatch: Model returned {predictions.shape[1]} classes, but expected {len(classes)}", False
+
+    predicted_index = np.argmax(predictions[0])
+    if predicted_index >= len(classes):
+        return f"⚠ Predicted index {predicted_index} is out of range for class list", False
+
+    predicted_class = classes[predicted_index]
+    confidence = float(np.max(predictions)) * 100
+
+    return f"{predicted_class} ({confidence:.2f}%)", True
+
+def predict_disease_with_info(uploaded_file, model_type="poultry"):
+    """
+    Predict disease from an uploaded image.
+    Returns (result text, served_from_cache).
+    """
+    with PREDICTION_SECONDS.time(model_type=model_type, cached="false") as labels:
+        try:
+            img_bytes = uploaded_file.read()
+            version = model_version(model_type)
+            key = PredictionCache.make_key(img_bytes, model_type, version) if version else None
+            if key:
+                cached = prediction_cache.get(key)
+                if cached is not None:
+                    labels["cached"] = "true"
+                    return cached, True
+
+            result, ok = _predict_bytes(img_bytes, model_type)
+            if ok and key:
+                prediction_cache.put(key, result, model_type, version)
+            return result, False
+
+        except Exception as e:
+            return f"⚠ Error during prediction: {e}", False
+
+def predict_disease(uploaded_file, model_type="poultry"):
+    """
+    Predict disease from an uploaded image.
+    """
+    result, _ = predict_disease_with_info(uploaded_file, model_type)
+    return result
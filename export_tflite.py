@@ -0,0 +1,159 @@
+"""
+Export the Keras disease classifiers to quantized TFLite artifacts and check
+them against the originals.
+
+    python export_tflite.py --quant float16
+    python export_tflite.py --quant int8 --samples data/samples/crop --models crop
+    python export_tflite.py --parity --samples data/samples/crop --models crop
+
+Serve the exported files with FARMIN_MODEL_BACKEND=tflite (and
+FARMIN_TFLITE_QUANT matching --quant).
+"""
+import argparse
+import glob
+import json
+import os
+import time
+
+import numpy as np
+
+from detection import (
+    MODEL_CLASSES,
+    MODEL_PATHS,
+    TFLiteModel,
+    _rss_bytes,
+    preprocess_image,
+    tflite_path,
+)
+
+QUANTIZATIONS = ("float16", "dynamic", "int8")
+IMAGE_PATTERNS = ("*.jpg", "*.jpeg", "*.png")
+
+
+def load_samples(sample_dir, limit=64):
+    """Preprocessed (1, 224, 224, 3) arrays for the images in sample_dir."""
+    files = []
+    for pattern in IMAGE_PATTERNS:
+        files.extend(glob.glob(os.path.join(sample_dir, pattern)))
+    samples = []
+    for path in sorted(files)[:limit]:
+        with open(path, "rb") as f:
+            samples.append(preprocess_image(f.read()))
+    return samples
+
+
+def export_model(name, quantization="float16", samples=None):
+    """Convert models/<name>_disease_model.h5 and write the .tflite next to it."""
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(MODEL_PATHS[name])
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if quantization == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == "int8":
+        if not samples:
+            print(f"⚠ No samples for {name}; calibrating int8 on random inputs")
+            shape = (1,) + tuple(model.input_shape[1:])
+            samples = [np.random.rand(*shape).astype(np.float32) for _ in range(16)]
+
+        def representative_dataset():
+            for sample in samples:
+                yield [sample.astype(np.float32)]
+
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    # "dynamic" keeps Optimize.DEFAULT only: int8 weights, float activations
+
+    out_path = tflite_path(MODEL_PATHS[name], quantization)
+    with open(out_path, "wb") as f:
+        f.write(converter.convert())
+    print(f"✅ {name}: {os.path.getsize(MODEL_PATHS[name]) / 1e6:.1f} MB -> "
+          f"{os.path.getsize(out_path) / 1e6:.1f} MB ({out_path})")
+    return out_path
+
+
+def _timed_predictions(model, samples):
+    predictions, latencies = [], []
+    model.predict(samples[0], verbose=0)  # warm-up
+    for sample in samples:
+        start = time.perf_counter()
+        predictions.append(model.predict(sample, verbose=0)[0])
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(predictions), latencies
+
+
+def _load_measured(loader):
+    before = _rss_bytes()
+    model = loader()
+    return model, max(_rss_bytes() - before, 0)
+
+
+def parity_check(name, samples, quantization="float16"):
+    """Compare top-1 labels/confidences and latency/RSS between Keras and TFLite."""
+    import tensorflow as tf
+
+    if not samples:
+        raise ValueError(f"parity check for {name} needs at least one sample image")
+
+    # TFLite first: it is much smaller, so its RSS delta isn't masked by Keras
+    lite, lite_rss = _load_measured(lambda: TFLiteModel(tflite_path(MODEL_PATHS[name], quantization)))
+    keras, keras_rss = _load_measured(lambda: tf.keras.models.load_model(MODEL_PATHS[name]))
+
+    keras_pred, keras_ms = _timed_predictions(keras, samples)
+    lite_pred, lite_ms = _timed_predictions(lite, samples)
+
+    keras_top = keras_pred.argmax(axis=1)
+    lite_top = lite_pred.argmax(axis=1)
+    keras_conf = keras_pred.max(axis=1)
+    lite_conf = lite_pred.max(axis=1)
+    mismatches = [
+        {"sample": i, "keras": MODEL_CLASSES[name][k], "tflite": MODEL_CLASSES[name][l]}
+        for i, (k, l) in enumerate(zip(keras_top, lite_top)) if k != l
+    ]
+
+    return {
+        "model": name,
+        "quantization": quantization,
+        "samples": len(samples),
+        "top1_agreement": float((keras_top == lite_top).mean()),
+        "max_confidence_diff": float(np.abs(keras_conf - lite_conf).max()),
+        "mean_confidence_diff": float(np.abs(keras_conf - lite_conf).mean()),
+        "keras_p50_ms": float(np.percentile(keras_ms, 50)),
+        "tflite_p50_ms": float(np.percentile(lite_ms, 50)),
+        "keras_rss_mb": keras_rss / 1e6,
+        "tflite_rss_mb": lite_rss / 1e6,
+        "mismatches": mismatches,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and verify quantized TFLite disease models.")
+    parser.add_argument("--quant", choices=QUANTIZATIONS, default="float16")
+    parser.add_argument("--models", nargs="+", choices=sorted(MODEL_PATHS), default=sorted(MODEL_PATHS))
+    parser.add_argument("--samples", help="directory of sample images for int8 calibration and parity")
+    parser.add_argument("--parity", action="store_true", help="only run the parity check on existing artifacts")
+    parser.add_argument("--min-agreement", type=float, default=0.98,
+                        help="fail if top-1 agreement falls below this")
+    args = parser.parse_args()
+
+    samples = load_samples(args.samples) if args.samples else []
+    failed = False
+    for name in args.models:
+        if not args.parity:
+            export_model(name, args.quant, samples)
+        if samples:
+            report = parity_check(name, samples, args.quant)
+            print(json.dumps(report, indent=2))
+            if report["top1_agreement"] < args.min_agreement:
+                print(f"❌ {name}: top-1 agreement {report['top1_agreement']:.2%} "
+                      f"is below {args.min_agreement:.2%}")
+                failed = True
+        elif args.parity:
+            print(f"⚠ Skipping parity for {name}: pass --samples")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
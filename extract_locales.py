@@ -0,0 +1,107 @@
+"""
+Collect the static UI strings passed to t()/translate_text() in main.py and
+components/*.py, and compile them into per-language catalogs under locales/.
+
+    python extract_locales.py              # refresh locales/messages.json only
+    python extract_locales.py --compile    # also (re)build locales/<lang>.json
+
+Compiling needs network access once; at runtime the catalogs are read from
+disk so static labels never hit the translation provider.
+"""
+import argparse
+import ast
+import glob
+import json
+import os
+
+LOCALE_DIR = "locales"
+MESSAGES_FILE = os.path.join(LOCALE_DIR, "messages.json")
+LOCALE_LANGS = ["te", "hi", "ta", "kn"]  # same languages as ollama_backend's lang_map
+
+SOURCE_FILES = ["main.py"] + sorted(glob.glob("components/*.py"))
+TRANSLATE_CALLS = {"t", "translate_text"}
+STATIC_LIST_NAMES = {"pages", "STATIC_TEXTS"}
+
+
+def _string_literal(node):
+    if isinstance(node, ast.Constant) and isinstance(node.value, str) and node.value.strip():
+        return node.value
+    return None
+
+
+def extract_strings(path):
+    """Return every literal string this file sends through the translator."""
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    found = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and node.args:
+            func = node.func
+            name = func.id if isinstance(func, ast.Name) else getattr(func, "attr", None)
+            if name in TRANSLATE_CALLS:
+                literal = _string_literal(node.args[0])
+                if literal:
+                    found.append(literal)
+        elif isinstance(node, ast.Assign) and isinstance(node.value, ast.List):
+            targets = {t.id for t in node.targets if isinstance(t, ast.Name)}
+            if targets & STATIC_LIST_NAMES:
+                found.extend(s for s in map(_string_literal, node.value.elts) if s)
+    return found
+
+
+def collect_messages(files=None):
+    messages = set()
+    for path in files or SOURCE_FILES:
+        messages.update(extract_strings(path))
+    return sorted(messages)
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compile_catalog(lang, messages):
+    """Translate messages missing from locales/<lang>.json and write it back."""
+    from components.translator import translate_many
+
+    path = os.path.join(LOCALE_DIR, f"{lang}.json")
+    catalog = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            catalog = json.load(f)
+
+    missing = [m for m in messages if m not in catalog]
+    if missing:
+        for text, translated in zip(missing, translate_many(missing, lang, source_lang="en")):
+            # An untranslated echo means the provider failed; leave it for the next run
+            if translated and translated != text:
+                catalog[text] = translated
+
+    # Drop strings that no longer appear in the source
+    catalog = {k: v for k, v in catalog.items() if k in set(messages)}
+    write_json(path, catalog)
+    return len(catalog), len(messages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract and compile UI translation catalogs.")
+    parser.add_argument("--compile", action="store_true", help="build per-language catalogs")
+    parser.add_argument("--lang", action="append", help="limit compilation to these language codes")
+    args = parser.parse_args()
+
+    messages = collect_messages()
+    write_json(MESSAGES_FILE, messages)
+    print(f"📝 Extracted {len(messages)} strings to {MESSAGES_FILE}")
+
+    if args.compile:
+        for lang in args.lang or LOCALE_LANGS:
+            done, total = compile_catalog(lang, messages)
+            print(f"🌐 {lang}: {done}/{total} strings translated")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Content-addressed file store for uploaded disease images.
+
+Files are named by the SHA-256 of their bytes (image_store/ab/abcdef....jpg),
+so uploading the same photo twice stores it once. SQLite keeps only the
+hash and metadata (see db.py), which keeps farmer_data.db small and lets
+the gallery hand file paths straight to st.image.
+
+Each image also gets a small WebP thumbnail (image_store/thumbs/ab/abcdef....webp),
+made once at ingest, so the gallery grid never sends full-resolution photos.
+"""
+import hashlib
+import io
+import os
+import tempfile
+
+IMAGE_STORE_DIR = os.environ.get("FARMIN_IMAGE_STORE", "image_store")
+THUMBNAIL_SIZE = int(os.environ.get("FARMIN_THUMBNAIL_SIZE", "320"))   # longest side, pixels
+THUMBNAIL_QUALITY = 70
+
+_EXTENSIONS = {"image/jpeg": ".jpg", "image/png": ".png", "image/webp": ".webp", "image/gif": ".gif"}
+
+
+def sniff_mime(data):
+    """Image type from the file's magic bytes; the extension st.image needs depends on it."""
+    if data[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    return "application/octet-stream"
+
+
+def make_thumbnail(data, size=THUMBNAIL_SIZE, quality=THUMBNAIL_QUALITY):
+    """WebP thumbnail bytes for an image, or None if it can't be decoded."""
+    # Imported here so db.py stays importable by tools that never touch pixels
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.draft("RGB", (size, size))   # JPEG: decode at reduced scale, much cheaper
+            image = ImageOps.exif_transpose(image)
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+            image.thumbnail((size, size), Image.Resampling.LANCZOS)
+            out = io.BytesIO()
+            image.save(out, format="WEBP", quality=quality, method=4)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError):
+        return None
+    return out.getvalue()
+
+
+class ImageStore:
+    def __init__(self, root=IMAGE_STORE_DIR):
+        self.root = root
+
+    def path_for(self, digest, mime):
+        return os.path.join(self.root, digest[:2], digest + _EXTENSIONS.get(mime, ".bin"))
+
+    def thumbnail_path(self, digest):
+        return os.path.join(self.root, "thumbs", digest[:2], digest + ".webp")
+
+    def put(self, data):
+        """Store bytes; returns (sha256 hex digest, mime type). Existing content isn't rewritten."""
+        digest = hashlib.sha256(data).hexdigest()
+        mime = sniff_mime(data)
+        _write_once(self.path_for(digest, mime), data)
+        return digest, mime
+
+    def put_thumbnail(self, digest, thumbnail):
+        _write_once(self.thumbnail_path(digest), thumbnail)
+
+    def read(self, digest, mime):
+        with open(self.path_for(digest, mime), "rb") as f:
+            return f.read()
+
+    def delete(self, digest, mime):
+        for path in (self.path_for(digest, mime), self.thumbnail_path(digest)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def usage(self):
+        """(file count, total bytes) currently in the store."""
+        files = total = 0
+        for dirpath, _, names in os.walk(self.root):
+            for name in names:
+                if not name.endswith(".tmp"):
+                    files += 1
+                    total += os.path.getsize(os.path.join(dirpath, name))
+        return files, total
+
+
+def _write_once(path, data):
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write to a temp file and rename, so readers never see a partial image
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
@@ -0,0 +1,129 @@
+"""
+Cross-session micro-batching in front of the disease models.
+
+Requests for the same model that arrive within a few milliseconds of each
+other are stacked into one batch and run as a single forward pass; each
+caller gets back its own rows of the result.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+MAX_BATCH_SIZE = int(os.environ.get("FARMIN_MAX_BATCH", "8"))
+MAX_WAIT_MS = float(os.environ.get("FARMIN_MAX_WAIT_MS", "5"))
+
+
+class _Request:
+    __slots__ = ("inputs", "future", "enqueued_at")
+
+    def __init__(self, inputs):
+        self.inputs = inputs
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class BatchingInferenceService:
+    """One queue and worker thread per model; batches close at max size or max wait."""
+
+    def __init__(self, get_model, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.get_model = get_model
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queues = {}
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _queue_for(self, name):
+        with self._lock:
+            if name not in self._queues:
+                self._queues[name] = queue.Queue()
+                self._metrics[name] = {
+                    "requests": 0,
+                    "batches": 0,
+                    "errors": 0,
+                    "max_batch_size_seen": 0,
+                    "last_batch_ms": 0.0,
+                    "total_wait_ms": 0.0,
+                }
+                worker = threading.Thread(
+                    target=self._worker, args=(name,), name=f"inference-{name}", daemon=True
+                )
+                worker.start()
+            return self._queues[name]
+
+    def submit(self, name, inputs):
+        """Queue an (N, H, W, C) array for `name`; returns a Future of its predictions."""
+        request = _Request(np.asarray(inputs))
+        self._queue_for(name).put(request)
+        return request.future
+
+    def predict(self, name, inputs, timeout=None):
+        return self.submit(name, inputs).result(timeout=timeout)
+
+    def _collect(self, q):
+        first = q.get()
+        batch = [first]
+        size = len(first.inputs)
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = q.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request.inputs)
+        return batch
+
+    def _worker(self, name):
+        q = self._queues[name]
+        while True:
+            batch = self._collect(q)
+            self._run(name, batch)
+
+    def _run(self, name, batch):
+        metrics = self._metrics[name]
+        start = time.perf_counter()
+        try:
+            model = self.get_model(name)
+            if model is None:
+                raise RuntimeError(f"model not loaded: {name}")
+            inputs = batch[0].inputs if len(batch) == 1 else np.concatenate([r.inputs for r in batch])
+            predictions = model.predict(inputs, verbose=0)
+        except Exception as e:
+            with self._lock:
+                metrics["errors"] += len(batch)
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        offset = 0
+        for request in batch:
+            count = len(request.inputs)
+            request.future.set_result(predictions[offset:offset + count])
+            offset += count
+
+        with self._lock:
+            metrics["requests"] += len(batch)
+            metrics["batches"] += 1
+            metrics["max_batch_size_seen"] = max(metrics["max_batch_size_seen"], offset)
+            metrics["last_batch_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            metrics["total_wait_ms"] += sum((start - r.enqueued_at) * 1000 for r in batch)
+
+    def stats(self):
+        """Queue depth and batching counters per model."""
+        with self._lock:
+            out = {}
+            for name, q in self._queues.items():
+                m = dict(self._metrics[name])
+                m["queue_depth"] = q.qsize()
+                m["avg_batch_size"] = round(m["requests"] / m["batches"], 2) if m["batches"] else 0.0
+                m["avg_wait_ms"] = round(m.pop("total_wait_ms") / m["requests"], 3) if m["requests"] else 0.0
+                out[name] = m
+            return out
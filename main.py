@@ -1,14 +1,14 @@
 import streamlit as st
 from components.translator import translate_text
 
-# Import individual components directly instead of through __init__
-import components.home as home
-import components.Assistant as Assistant
-import components.record_keeping as record_keeping
-import components.disease_detection as disease_detection
-import components.weather_crop_planner as weather_crop_planner
-import components.profit_calculator as profit_calculator
-import components.crop_suggestion as crop_suggestion
+# Page modules are imported on first selection (see page_loader.PAGE_ROUTES)
+# so heavy dependencies don't delay the Home page
+from page_loader import load_page
+
+import metrics
+
+PAGE_RENDER_SECONDS = metrics.histogram("farmin_page_render_seconds", "Page render time", ["page"])
+metrics.start_metrics_server()  # only when FARMIN_METRICS_PORT is set
 
 # Import feedback components with fallback
 try:
@@ -98,22 +98,10 @@ if st.session_state["navigated_from_card"]:
 # ---- Page Routing ----
 with st.spinner(t("Loading...")):
     current_page = st.session_state["selected_page"]
-    if current_page == "Home":
-        home.show(dest_lang)
-    elif current_page == "Voice & Text Assistant":
-        Assistant.show(dest_lang)
-    elif current_page == "Crop Suggestion":
-        crop_suggestion.show(dest_lang)
-    elif current_page == "Weather-Based Crop Planning":
-        weather_crop_planner.show(dest_lang)
-    elif current_page == "Disease Detection":
-        disease_detection.show(dest_lang)
-    elif current_page == "Profit Calculator":
-        profit_calculator.show(dest_lang)
-    elif current_page == "Farm Record Keeping":
-        record_keeping.show(dest_lang)
-    elif current_page == "Feedback" and FEEDBACK_AVAILABLE:
-        feedback_page.feedback_page(dest_lang)  # Call the function from the module
+    if current_page == "Feedback" and not FEEDBACK_AVAILABLE:
+        current_page = "Home"
+    with PAGE_RENDER_SECONDS.time(page=current_page):
+        load_page(current_page)(dest_lang)
 
 # ---- Footer ----
 st.markdown("---")
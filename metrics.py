@@ -0,0 +1,238 @@
+"""
+Lightweight in-process metrics with Prometheus text export (stdlib only).
+
+Hot paths declare counters and latency histograms at import time:
+
+    TRANSLATE_SECONDS = metrics.histogram("farmin_translate_seconds", "translate_text latency", ["cached"])
+    with TRANSLATE_SECONDS.time(cached="false") as labels:
+        ...
+        labels["cached"] = "true"     # labels can be settled inside the block
+
+Modules that already keep stats dicts (caches, queues, the circuit breaker)
+register them with register_stats() and are sampled as gauges at scrape time.
+Set FARMIN_METRICS_PORT to serve /metrics from a side thread:
+
+    FARMIN_METRICS_PORT=9464 streamlit run main.py
+    curl -s localhost:9464/metrics
+"""
+import bisect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+METRICS_PORT = os.environ.get("FARMIN_METRICS_PORT")      # unset = no endpoint
+METRICS_HOST = os.environ.get("FARMIN_METRICS_HOST", "127.0.0.1")
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_lock = threading.Lock()
+_metrics = {}          # name -> Counter | Histogram, in declaration order
+_collectors = []       # (prefix, fn, label) sampled at scrape time
+
+
+def _label_key(labelnames, labels):
+    missing = set(labelnames) - set(labels)
+    extra = set(labels) - set(labelnames)
+    if missing or extra:
+        raise ValueError(f"labels {sorted(labels)} don't match {list(labelnames)}")
+    return tuple(str(labels[n]) for n in labelnames)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with _lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield self.name, list(zip(self.labelnames, key)), value
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}      # key -> [per-bucket counts..., +Inf count, sum]
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            row[idx] += 1
+            row[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the block's duration; the yielded labels may be changed inside it."""
+        labels = dict(labels)
+        start = time.perf_counter()
+        try:
+            yield labels
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def timed(self, **labels):
+        """Decorator form of time()."""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.time(**labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def samples(self):
+        with _lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        for key, row in items:
+            pairs = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), row[:-1]):
+                cumulative += count
+                yield f"{self.name}_bucket", pairs + [("le", _format_value(float(bound)))], cumulative
+            yield f"{self.name}_sum", pairs, row[-1]
+            yield f"{self.name}_count", pairs, cumulative
+
+
+def _declare(cls, name, help, labelnames, **kwargs):
+    with _lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = cls(name, help, labelnames, **kwargs)
+        elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+            raise ValueError(f"metric {name} already declared differently")
+    return metric
+
+
+def counter(name, help, labelnames=()):
+    """Get or create a counter (safe to call again when Streamlit re-runs a script)."""
+    return _declare(Counter, name, help, labelnames)
+
+
+def histogram(name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+    """Get or create a latency histogram, in seconds."""
+    return _declare(Histogram, name, help, labelnames, buckets=buckets)
+
+
+def register_stats(prefix, fn, label=None):
+    """
+    Export a stats() dict as gauges named `<prefix>_<key>`. With `label`,
+    fn() returns {label_value: stats dict}, e.g. per-model queue depths.
+    Non-numeric values are skipped.
+    """
+    with _lock:
+        _collectors[:] = [c for c in _collectors if c[0] != prefix]
+        _collectors.append((prefix, fn, label))
+
+
+def _collect_stats():
+    families = {}
+    with _lock:
+        collectors = list(_collectors)
+    for prefix, fn, label in collectors:
+        try:
+            stats = fn()
+        except Exception as e:
+            logger.warning(f"Metrics collector {prefix} failed: {e}")
+            continue
+        groups = stats.items() if label else [(None, stats)]
+        for label_value, group in groups:
+            for key, value in group.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                pairs = [(label, label_value)] if label else []
+                families.setdefault(f"{prefix}_{key}", []).append((pairs, value))
+    return families
+
+
+def render():
+    """All metrics in Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    with _lock:
+        metrics = list(_metrics.values())
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        for name, pairs, value in metric.samples():
+            lines.append(f"{name}{_format_labels(pairs)} {_format_value(value)}")
+    for name, samples in _collect_stats().items():
+        lines.append(f"# TYPE {name} gauge")
+        for pairs, value in samples:
+            lines.append(f"{name}{_format_labels(pairs)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # scrapes every few seconds would flood the app log
+
+
+_server = None
+
+
+def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST):
+    """Serve /metrics on a daemon thread; a no-op without a port or if already running."""
+    global _server
+    if not port:
+        return None
+    with _lock:
+        if _server is not None:
+            return _server
+        try:
+            _server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+        except OSError as e:
+            logger.warning(f"Metrics endpoint not started on {host}:{port}: {e}")
+            return None
+        threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"📈 Metrics available at http://{host}:{port}/metrics")
+    return _server
@@ -1,38 +1,216 @@
 import requests
+import json
+import os
 import logging
-from typing import Optional, Dict, Any
+import threading
+from requests.adapters import HTTPAdapter
+from typing import Optional, Dict, Any, Iterator
 import time
+from circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, HALF_OPEN, OPEN
+import metrics
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-OLLAMA_BASE_URL = "http://localhost:11434"
+OLLAMA_BASE_URL = os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
 OLLAMA_GENERATE_URL = f"{OLLAMA_BASE_URL}/api/generate"
 OLLAMA_TAGS_URL = f"{OLLAMA_BASE_URL}/api/tags"
 MODEL_NAME = "deepseek-r1:1.5b"  # keep; prompt + postprocessing handle domain focus
 
+HEALTH_TTL = 15.0        # seconds a /api/tags result is trusted
+POOL_SIZE = 16           # keep-alive connections shared by all sessions
+
+AI_RESPONSE_SECONDS = metrics.histogram(
+    "farmin_ai_response_seconds", "get_ai_response latency including retries", ["outcome"]
+)
+FIRST_TOKEN_SECONDS = metrics.histogram("farmin_ollama_first_token_seconds", "Time to first streamed token")
+
+class OllamaClient:
+    """
+    Shared Ollama client: one pooled keep-alive session for every Streamlit
+    session, and a single cached /api/tags lookup that answers both "is it
+    running" and "is the model pulled". A background thread keeps the cached
+    status fresh so requests never wait on a health check. Generations go
+    through a circuit breaker: after repeated errors or very slow responses
+    the client reports itself not ready until a probe succeeds again.
+    """
+
+    def __init__(self, base_url=OLLAMA_BASE_URL, model_name=MODEL_NAME, health_ttl=HEALTH_TTL, pool_size=POOL_SIZE):
+        self.base_url = base_url
+        self.model_name = model_name
+        self.generate_url = f"{base_url}/api/generate"
+        self.tags_url = f"{base_url}/api/tags"
+        self.health_ttl = health_ttl
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._status = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._refresher = None
+        self.breaker = CircuitBreaker("ollama")
+
+    def _fetch_status(self) -> Dict[str, Any]:
+        try:
+            resp = self.session.get(self.tags_url, timeout=5)
+            if resp.status_code != 200:
+                return {"ollama_running": False, "model_available": False}
+            models = resp.json().get("models", [])
+            return {
+                "ollama_running": True,
+                "model_available": any(m.get("name") == self.model_name for m in models),
+            }
+        except Exception:
+            return {"ollama_running": False, "model_available": False}
+
+    def refresh_status(self) -> Dict[str, Any]:
+        status = self._fetch_status()
+        with self._lock:
+            self._status = status
+            self._checked_at = time.monotonic()
+        return status
+
+    def _refresh_loop(self):
+        while True:
+            time.sleep(self.health_ttl / 2)
+            self.refresh_status()
+
+    def _ensure_refresher(self):
+        with self._lock:
+            if self._refresher is None:
+                self._refresher = threading.Thread(target=self._refresh_loop, name="ollama-health", daemon=True)
+                self._refresher.start()
+
+    def status(self) -> Dict[str, Any]:
+        """Cached health/model status; only blocks when the cache is empty or stale."""
+        self._ensure_refresher()
+        with self._lock:
+            fresh = self._status is not None and time.monotonic() - self._checked_at < self.health_ttl
+            if fresh:
+                return dict(self._status)
+        return dict(self.refresh_status())
+
+    def is_ready(self) -> bool:
+        if not self.breaker.available():
+            return False
+        status = self.status()
+        return status["ollama_running"] and status["model_available"]
+
+    def mark_unhealthy(self):
+        """Drop the cached status after a failed request so the next call re-checks."""
+        with self._lock:
+            self._status = None
+
+    def generate(self, payload: Dict[str, Any], timeout: float = 40) -> Dict[str, Any]:
+        token = self.breaker.acquire()
+        start = time.perf_counter()
+        try:
+            resp = self.session.post(self.generate_url, json=payload, timeout=timeout)
+            resp.raise_for_status()
+            result = resp.json()
+        except Exception:
+            self.breaker.record_failure(token)
+            raise
+        self.breaker.record_success(token, time.perf_counter() - start)
+        return result
+
+    def generate_stream(self, payload: Dict[str, Any], timeout: float = 40) -> Iterator[Dict[str, Any]]:
+        """
+        Yield Ollama's NDJSON chunks as they arrive (timeout applies between
+        chunks). The breaker judges latency by time to first chunk.
+        """
+        token = self.breaker.acquire()
+        payload = dict(payload, stream=True)
+        start = time.perf_counter()
+        first_chunk_latency = None
+        try:
+            with self.session.post(self.generate_url, json=payload, timeout=timeout, stream=True) as resp:
+                resp.raise_for_status()
+                for line in resp.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise RuntimeError(chunk["error"])
+                    if first_chunk_latency is None:
+                        first_chunk_latency = time.perf_counter() - start
+                    yield chunk
+                    if chunk.get("done"):
+                        break
+        except GeneratorExit:
+            # Closed early by the consumer (cancelled): no verdict on the backend
+            self.breaker.release(token)
+            raise
+        except Exception:
+            self.breaker.record_failure(token)
+            raise
+        self.breaker.record_success(token, first_chunk_latency if first_chunk_latency is not None else time.perf_counter() - start)
+
+ollama_client = OllamaClient()
+
+_CIRCUIT_STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+metrics.register_stats(
+    "farmin_ollama_circuit",
+    lambda: dict(ollama_client.breaker.stats(), state=_CIRCUIT_STATE_CODES[ollama_client.breaker.state]),
+)
+
 def is_ollama_running() -> bool:
-    try:
-        resp = requests.get(OLLAMA_TAGS_URL, timeout=5)
-        return resp.status_code == 200
-    except Exception:
-        return False
+    return ollama_client.status()["ollama_running"]
 
 def ensure_model_available() -> bool:
-    try:
-        resp = requests.get(OLLAMA_TAGS_URL, timeout=10)
-        if resp.status_code == 200:
-            models = resp.json().get("models", [])
-            return any(m.get("name") == MODEL_NAME for m in models)
-        return False
-    except Exception:
-        return False
+    return ollama_client.status()["model_available"]
 
-def get_ai_response(prompt: str, lang_code: str = "en", max_retries: int = 2, attempt: int = 0) -> Optional[str]:
-    """Get response from Ollama with farming domain + language guard."""
-    if not is_ollama_running() or not ensure_model_available():
-        return None
+class ThinkFilter:
+    """
+    Strips <think>...</think> blocks from streamed text as it arrives. Tags
+    may be split across chunks, so a possible partial tag is held back until
+    the next chunk decides it.
+    """
+    OPEN, CLOSE = "<think>", "</think>"
+
+    def __init__(self):
+        self._buffer = ""
+        self._in_think = False
+
+    @staticmethod
+    def _partial_tag_len(text: str, tag: str) -> int:
+        lowered = text.lower()
+        for k in range(min(len(tag) - 1, len(text)), 0, -1):
+            if lowered.endswith(tag[:k]):
+                return k
+        return 0
+
+    def feed(self, chunk: str) -> str:
+        self._buffer += chunk
+        visible = []
+        while True:
+            tag = self.CLOSE if self._in_think else self.OPEN
+            idx = self._buffer.lower().find(tag)
+            if idx == -1:
+                keep = self._partial_tag_len(self._buffer, tag)
+                if not self._in_think:
+                    visible.append(self._buffer[:len(self._buffer) - keep])
+                self._buffer = self._buffer[len(self._buffer) - keep:]
+                break
+            if not self._in_think:
+                visible.append(self._buffer[:idx])
+            self._buffer = self._buffer[idx + len(tag):]
+            self._in_think = not self._in_think
+        return "".join(visible)
+
+    def flush(self) -> str:
+        rest = "" if self._in_think else self._buffer
+        self._buffer = ""
+        return rest
 
+def build_payload(prompt: str, lang_code: str = "en", attempt: int = 0, context=None,
+                  temperature: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Generation payload with the farming domain + language guard. `context` is
+    the token state returned by a previous generation; Ollama continues from
+    it instead of re-evaluating the earlier prompt.
+    """
     # Language instruction
     lang_instruction = ""
     if lang_code != "en":
@@ -53,7 +231,7 @@ def get_ai_response(prompt: str, lang_code: str = "en", max_retries: int = 2, at
         "prompt": final_prompt,
         "stream": False,
         "options": {
-            "temperature": 0.6 if attempt == 0 else 0.4,  # make retries more deterministic
+            "temperature": temperature if temperature is not None else (0.6 if attempt == 0 else 0.4),  # make retries more deterministic
             "top_p": 0.9,
             "top_k": 40,
             "num_predict": 512,
@@ -62,26 +240,48 @@ def get_ai_response(prompt: str, lang_code: str = "en", max_retries: int = 2, at
             "stop": ["<think>", "<|im_end|>"]
         }
     }
+    if context:
+        payload["context"] = context
+    return payload
 
+def get_ai_response(prompt: str, lang_code: str = "en", max_retries: int = 2, attempt: int = 0) -> Optional[str]:
+    """Get response from Ollama with farming domain + language guard."""
+    with AI_RESPONSE_SECONDS.time(outcome="unavailable") as labels:
+        return _get_ai_response(prompt, lang_code, max_retries, attempt, labels)
+
+def _get_ai_response(prompt, lang_code, max_retries, attempt, labels) -> Optional[str]:
+    if not ollama_client.is_ready():
+        return None
+
+    payload = build_payload(prompt, lang_code, attempt)
+
+    labels["outcome"] = "empty"
     for retry in range(max_retries):
         try:
             logger.info(f"Ollama request attempt {retry + 1} (temp={payload['options']['temperature']})")
-            resp = requests.post(OLLAMA_GENERATE_URL, json=payload, timeout=40)
-            resp.raise_for_status()
-            result = resp.json()
+            result = ollama_client.generate(payload, timeout=40)
             ai_response = result.get("response", "").strip()
             if ai_response:
                 logger.info(f"Received response: {ai_response[:140]}...")
+                labels["outcome"] = "ok"
                 return ai_response
+        except CircuitOpenError:
+            logger.info("Ollama circuit open; using local fallback")
+            labels["outcome"] = "circuit_open"
+            return None
         except Exception as e:
             logger.warning(f"Ollama attempt {retry + 1} failed: {e}")
+            labels["outcome"] = "error"
+            if isinstance(e, requests.ConnectionError):
+                ollama_client.mark_unhealthy()
+            if not ollama_client.is_ready():
+                return None
             time.sleep(0.8)
 
     return None
 
 def test_connection() -> Dict[str, Any]:
-    return {
-        "ollama_running": is_ollama_running(),
-        "model_available": ensure_model_available(),
-        "status": "success" if is_ollama_running() and ensure_model_available() else "failed"
-    }
+    status = ollama_client.refresh_status()
+    status["status"] = "success" if status["ollama_running"] and status["model_available"] else "failed"
+    status["circuit"] = ollama_client.breaker.stats()
+    return status
@@ -0,0 +1,297 @@
+"""
+Async gateway in front of the local Ollama instance.
+
+All Streamlit sessions share one asyncio event loop (running in a background
+thread) that admits at most `max_concurrency` generations at a time. Waiting
+requests are queued per session and dispatched round-robin, so one busy
+session can't starve the others. Requests can be cancelled while queued or
+mid-generation (the stream is closed, which stops Ollama generating), and
+callers can ask for their queue position to show "you are #3".
+
+Point it at a fake server for tests:
+    OllamaGateway(client=OllamaClient(base_url="http://127.0.0.1:8765"))
+"""
+import asyncio
+import itertools
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterator, Optional
+
+import metrics
+from ollama_backend import FIRST_TOKEN_SECONDS, ThinkFilter, build_payload, ollama_client
+
+logger = logging.getLogger(__name__)
+
+# Match Ollama's OLLAMA_NUM_PARALLEL; more than that just queues inside Ollama
+OLLAMA_MAX_CONCURRENCY = int(os.environ.get("FARMIN_OLLAMA_CONCURRENCY", "2"))
+
+_DONE = object()
+
+QUEUE_WAIT_SECONDS = metrics.histogram("farmin_gateway_queue_wait_seconds", "Time a generation waited for a slot")
+
+
+class GatewayJob:
+    """A queued or running generation. Text pieces are readable as they arrive."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, gateway, session_id, payload):
+        self.id = next(self._ids)
+        self.session_id = session_id
+        self.payload = payload
+        self.state = "queued"          # queued -> running -> done | failed | cancelled
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+        self.started_at = None
+        self.final = None              # Ollama's last chunk: context + eval counters
+        self._gateway = gateway
+        self._pieces = queue.Queue()
+        self._cancel_requested = threading.Event()
+
+    def position(self) -> int:
+        """1-based place in the queue; 0 once the job is running or finished."""
+        return self._gateway.position(self)
+
+    def cancel(self):
+        self._gateway.cancel(self)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_requested.is_set()
+
+    def result(self, timeout: Optional[float] = None) -> str:
+        return self.future.result(timeout=timeout)
+
+    def iter_text(self, timeout: Optional[float] = 40) -> Iterator[str]:
+        """Yield raw response text as it streams; raises if the job failed."""
+        while True:
+            piece = self._pieces.get(timeout=timeout)
+            if piece is _DONE:
+                break
+            yield piece
+        if self.future.cancelled():
+            raise CancelledError()
+        error = self.future.exception()
+        if error:
+            raise error
+
+
+class OllamaGateway:
+    def __init__(self, client=None, max_concurrency=OLLAMA_MAX_CONCURRENCY, timeout=40):
+        self.client = client or ollama_client
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.timeout = timeout
+        self._queues = OrderedDict()   # session_id -> deque of queued jobs, round-robin order
+        self._running = set()
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "cancelled": 0}
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="ollama-gw")
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="ollama-gateway", daemon=True)
+        self._thread.start()
+
+    # --- public API (any thread) ---
+
+    def submit(self, session_id: str, payload: Dict[str, Any]) -> GatewayJob:
+        job = GatewayJob(self, session_id, payload)
+        with self._lock:
+            self._queues.setdefault(session_id, deque()).append(job)
+            self._stats["submitted"] += 1
+        self._loop.call_soon_threadsafe(self._dispatch)
+        return job
+
+    def position(self, job: GatewayJob) -> int:
+        with self._lock:
+            if job.state != "queued":
+                return 0
+            # Simulate round-robin dispatch over the current per-session queues
+            place = 0
+            queues = list(self._queues.values())
+            for depth in range(max((len(q) for q in queues), default=0)):
+                for q in queues:
+                    if depth < len(q):
+                        place += 1
+                        if q[depth] is job:
+                            return place
+        return 0
+
+    def cancel(self, job: GatewayJob):
+        job._cancel_requested.set()
+        with self._lock:
+            if job.state != "queued":
+                return  # running jobs stop at their next streamed chunk
+            q = self._queues.get(job.session_id)
+            if q and job in q:
+                q.remove(job)
+            job.state = "cancelled"
+            self._stats["cancelled"] += 1
+        job.future.cancel()
+        job._pieces.put(_DONE)
+
+    def cancel_session(self, session_id: str):
+        """Cancel everything a session has queued or running (navigate away / clear chat)."""
+        with self._lock:
+            jobs = list(self._queues.get(session_id, ()))
+            jobs += [j for j in self._running if j.session_id == session_id]
+        for job in jobs:
+            self.cancel(job)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["running"] = len(self._running)
+            stats["queued"] = sum(len(q) for q in self._queues.values())
+            stats["sessions_waiting"] = sum(1 for q in self._queues.values() if q)
+            stats["max_concurrency"] = self.max_concurrency
+        return stats
+
+    # --- event loop side ---
+
+    def _next_job(self) -> Optional[GatewayJob]:
+        with self._lock:
+            for session_id in list(self._queues):
+                q = self._queues[session_id]
+                if not q:
+                    del self._queues[session_id]
+                    continue
+                job = q.popleft()
+                # Served sessions go to the back of the line
+                self._queues.move_to_end(session_id)
+                if not q:
+                    del self._queues[session_id]
+                job.state = "running"
+                job.started_at = time.perf_counter()
+                QUEUE_WAIT_SECONDS.observe(job.started_at - job.enqueued_at)
+                self._running.add(job)
+                return job
+        return None
+
+    def _dispatch(self):
+        while len(self._running) < self.max_concurrency:
+            job = self._next_job()
+            if job is None:
+                break
+            self._loop.create_task(self._run(job))
+
+    async def _run(self, job: GatewayJob):
+        try:
+            text = await self._loop.run_in_executor(self._executor, self._generate, job)
+            if job.cancelled:
+                job.state = "cancelled"
+                job.future.cancel()
+                key = "cancelled"
+            else:
+                job.state = "done"
+                job.future.set_result(text)
+                key = "completed"
+        except Exception as e:
+            logger.warning(f"Gateway job {job.id} failed: {e}")
+            job.state = "failed"
+            job.future.set_exception(e)
+            key = "failed"
+        finally:
+            job._pieces.put(_DONE)
+            with self._lock:
+                self._running.discard(job)
+                self._stats[key] += 1
+            self._dispatch()
+
+    def _generate(self, job: GatewayJob) -> str:
+        """Runs on a worker thread; closing the stream early aborts generation in Ollama."""
+        parts = []
+        stream = self.client.generate_stream(job.payload, timeout=self.timeout)
+        try:
+            for chunk in stream:
+                if job.cancelled:
+                    break
+                if not parts and chunk.get("response"):
+                    FIRST_TOKEN_SECONDS.observe(time.perf_counter() - job.started_at)
+                if chunk.get("done"):
+                    job.final = chunk
+                piece = chunk.get("response", "")
+                if piece:
+                    parts.append(piece)
+                    job._pieces.put(piece)
+        finally:
+            stream.close()
+        return "".join(parts)
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway() -> OllamaGateway:
+    """Process-wide gateway shared by every Streamlit session."""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = OllamaGateway()
+            metrics.register_stats("farmin_gateway", _gateway.stats)
+        return _gateway
+
+
+def stream_via_gateway(session_id: str, prompt: str, lang_code: str = "en", attempt: int = 0,
+                       on_queued=None, context=None, on_done=None) -> Iterator[str]:
+    """
+    Yield visible response text as Ollama generates it, admitted through the
+    gateway, with <think> blocks removed on the fly. Yields nothing if Ollama
+    is unavailable. `on_queued(position)` is called while the request waits and
+    `on_done(final_chunk)` once generation finishes. The request is
+    cancelled if the caller stops iterating early (e.g. Streamlit rerun).
+    """
+    gateway = get_gateway()
+    if not gateway.client.is_ready():
+        return
+    job = gateway.submit(session_id, build_payload(prompt, lang_code, attempt, context=context))
+    try:
+        last_position = None
+        while job.state == "queued":
+            position = job.position()
+            if on_queued and position and position != last_position:
+                on_queued(position)
+                last_position = position
+            time.sleep(0.2)
+
+        think_filter = ThinkFilter()
+        for piece in job.iter_text(timeout=gateway.timeout):
+            text = think_filter.feed(piece)
+            if text:
+                yield text
+        tail = think_filter.flush()
+        if tail:
+            yield tail
+        if on_done:
+            on_done(job.final or {})
+    except Exception as e:
+        logger.warning(f"Gateway stream failed: {e}")
+    finally:
+        if job.state in ("queued", "running"):
+            job.cancel()
+
+
+def generate_via_gateway(session_id: str, prompt: str, lang_code: str = "en", attempt: int = 0,
+                         timeout: Optional[float] = None) -> Optional[str]:
+    """
+    Blocking counterpart of stream_via_gateway: wait for the whole reply.
+    Returns None if Ollama is unavailable, the generation fails or it takes
+    longer than `timeout` (the gateway's own timeout by default).
+    """
+    gateway = get_gateway()
+    if not gateway.client.is_ready():
+        return None
+    job = gateway.submit(session_id, build_payload(prompt, lang_code, attempt))
+    try:
+        reply = job.result(timeout=timeout or gateway.timeout).strip()
+        return reply or None
+    except Exception as e:
+        logger.warning(f"Gateway generation failed: {e}")
+        return None
+    finally:
+        if job.state in ("queued", "running"):
+            job.cancel()
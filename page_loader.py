@@ -0,0 +1,102 @@
+"""
+On-demand page loading for main.py.
+
+Each page module is imported the first time it is selected, so the Home page
+doesn't wait for TensorFlow, plotly/pandas or the speech stack. Import cost is
+recorded per page; run `python page_loader.py` for a cold-start budget report
+measured in a fresh interpreter per page.
+"""
+import importlib
+import json
+import subprocess
+import sys
+import threading
+import time
+
+# Page label -> (module, entry function)
+PAGE_ROUTES = {
+    "Home": ("components.home", "show"),
+    "Voice & Text Assistant": ("components.Assistant", "show"),
+    "Crop Suggestion": ("components.crop_suggestion", "show"),
+    "Weather-Based Crop Planning": ("components.weather_crop_planner", "show"),
+    "Disease Detection": ("components.disease_detection", "show"),
+    "Profit Calculator": ("components.profit_calculator", "show"),
+    "Farm Record Keeping": ("components.record_keeping", "show"),
+    "Feedback": ("components.feedback_page", "feedback_page"),
+}
+
+# Already imported by main.py before any page renders; excluded from per-page cost
+BASELINE_MODULES = ["streamlit", "components.translator", "components.feedback_button"]
+
+_import_times = {}
+_import_lock = threading.Lock()
+
+
+def load_page(page):
+    """Import the page's module if needed and return its render function."""
+    module_name, func_name = PAGE_ROUTES[page]
+    module = sys.modules.get(module_name)
+    if module is None:
+        with _import_lock:
+            module = sys.modules.get(module_name)
+            if module is None:
+                before = len(sys.modules)
+                start = time.perf_counter()
+                module = importlib.import_module(module_name)
+                _import_times[page] = {
+                    "module": module_name,
+                    "seconds": round(time.perf_counter() - start, 4),
+                    "new_modules": len(sys.modules) - before,
+                }
+                print(f"📦 Loaded page '{page}' in {_import_times[page]['seconds']:.2f}s")
+    return getattr(module, func_name)
+
+
+def import_report():
+    """Import cost of each page loaded so far in this process."""
+    return dict(_import_times)
+
+
+def _measure_cold_import(module_name, preload=()):
+    code = (
+        "import sys, time, importlib; sys.path.insert(0, '.');"
+        f"[importlib.import_module(m) for m in {list(preload)!r}];"
+        "b = len(sys.modules); s = time.perf_counter();"
+        f"import {module_name};"
+        "print(time.perf_counter() - s, len(sys.modules) - b)"
+    )
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if proc.returncode != 0:
+        return None, None, proc.stderr.strip().splitlines()[-1:] or ["import failed"]
+    seconds, modules = proc.stdout.strip().splitlines()[-1].split()
+    return float(seconds), int(modules), None
+
+
+def cold_start_report(routes=None):
+    """
+    Time each page's dependency tree in its own fresh interpreter, on top of
+    the baseline modules main.py always imports.
+    """
+    report = {}
+    seconds, modules, error = _measure_cold_import("; import ".join(BASELINE_MODULES))
+    report["(baseline)"] = {"module": ", ".join(BASELINE_MODULES), "seconds": seconds, "new_modules": modules}
+    if error:
+        report["(baseline)"]["error"] = error[0]
+    for page, (module_name, _) in (routes or PAGE_ROUTES).items():
+        seconds, modules, error = _measure_cold_import(module_name, preload=BASELINE_MODULES)
+        report[page] = {"module": module_name, "seconds": seconds, "new_modules": modules}
+        if error:
+            report[page]["error"] = error[0]
+    return report
+
+
+if __name__ == "__main__":
+    report = cold_start_report()
+    if "--json" in sys.argv:
+        print(json.dumps(report, indent=2))
+    else:
+        for page, row in sorted(report.items(), key=lambda kv: -(kv[1]["seconds"] or 0)):
+            if row["seconds"] is None:
+                print(f"{page:<30} {'-':>8}   {row.get('error', '')}")
+            else:
+                print(f"{page:<30} {row['seconds']:>7.3f}s  {row['new_modules']:>5} modules")
@@ -0,0 +1,142 @@
+"""
+Memoized disease predictions keyed by (image content hash, model type, model version).
+
+The model version is derived from the model file's mtime and size, so
+replacing a model file makes its old entries unreachable without a manual
+flush. Entries live in a bounded in-process LRU, optionally backed by a
+SQLite table that is bounded too (least recently accessed rows are evicted).
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+PREDICTION_CACHE_SIZE = int(os.environ.get("FARMIN_PREDICTION_CACHE_SIZE", "1024"))
+PREDICTION_CACHE_DB = os.environ.get("FARMIN_PREDICTION_CACHE_DB")  # unset = memory only
+PREDICTION_CACHE_DISK_SIZE = int(os.environ.get("FARMIN_PREDICTION_CACHE_DISK_SIZE", "20000"))
+
+
+def file_version(path):
+    """Version tag for a model file; None if it doesn't exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+
+class PredictionCache:
+    def __init__(self, max_entries=PREDICTION_CACHE_SIZE, db_path=PREDICTION_CACHE_DB,
+                 max_disk_entries=PREDICTION_CACHE_DISK_SIZE):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.db_path = db_path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0}
+        if db_path:
+            conn = sqlite3.connect(db_path)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS predictions (
+                    key TEXT PRIMARY KEY,
+                    model_type TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL DEFAULT 0
+                )
+            """)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(predictions)")}
+            if "accessed_at" not in columns:
+                # Tables from before the disk tier was bounded
+                conn.execute("ALTER TABLE predictions ADD COLUMN accessed_at REAL NOT NULL DEFAULT 0")
+                conn.execute("UPDATE predictions SET accessed_at=created_at")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_predictions_accessed ON predictions (accessed_at)")
+            conn.commit()
+            conn.close()
+
+    @staticmethod
+    def make_key(img_bytes, model_type, version):
+        digest = hashlib.sha256(img_bytes).hexdigest()
+        return f"{model_type}:{version}:{digest}"
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return self._entries[key]
+        result = self._disk_get(key)
+        with self._lock:
+            if result is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+        self._memory_put(key, result)
+        return result
+
+    def put(self, key, result, model_type="", version=""):
+        self._memory_put(key, result)
+        if self.db_path:
+            try:
+                conn = sqlite3.connect(self.db_path, timeout=5)
+                now = time.time()
+                conn.execute(
+                    "INSERT OR REPLACE INTO predictions (key, model_type, version, result, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, model_type, version, result, now, now)
+                )
+                # Rows for replaced model files can never hit again
+                conn.execute(
+                    "DELETE FROM predictions WHERE model_type=? AND version<>?", (model_type, version)
+                )
+                count = conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+                if count > self.max_disk_entries:
+                    conn.execute("""
+                        DELETE FROM predictions WHERE rowid IN (
+                            SELECT rowid FROM predictions ORDER BY accessed_at ASC LIMIT ?
+                        )
+                    """, (count - self.max_disk_entries,))
+                conn.commit()
+                conn.close()
+            except Exception as e:
+                print(f"[Prediction Cache Error] {e}")
+
+    def _memory_put(self, key, result):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _disk_get(self, key):
+        if not self.db_path:
+            return None
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=5)
+            row = conn.execute("SELECT result FROM predictions WHERE key=?", (key,)).fetchone()
+            if row:
+                conn.execute("UPDATE predictions SET accessed_at=? WHERE key=?", (time.time(), key))
+                conn.commit()
+            conn.close()
+            return row[0] if row else None
+        except Exception as e:
+            print(f"[Prediction Cache Error] {e}")
+            return None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.db_path:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute("DELETE FROM predictions")
+            conn.commit()
+            conn.close()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        return stats
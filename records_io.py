@@ -0,0 +1,217 @@
+"""
+Bulk import and export of farm records and disease-image metadata.
+
+Imports read CSV or JSONL a row at a time, validate each row, and insert the
+valid ones in a single transaction (db.bulk_insert_*), so a co-operative's
+ledger of tens of thousands of entries goes in at once or not at all. Rows
+that fail validation are skipped and reported with their line number.
+
+Exports walk the table in chunks (db.iter_*) and yield text a chunk at a
+time, so memory stays flat however large the table is.
+
+    python records_io.py import records ledger.csv
+    python records_io.py export records records.jsonl
+    python records_io.py export images images.csv
+
+Image imports only bring in metadata: the files must already be in the
+image store (copy the image_store/ directory across first). Missing
+thumbnails for the imported images are made after the import.
+"""
+import argparse
+import csv
+import datetime
+import io
+import json
+import os
+import re
+
+import db
+from image_store import _EXTENSIONS
+
+RECORD_FIELDS = ("id", "record_type", "detail", "date")
+IMAGE_FIELDS = ("id", "name", "category", "description", "image_hash", "mime_type", "size_bytes")
+FORMATS = ("csv", "jsonl")
+MAX_REPORTED_ERRORS = 1000
+
+
+class ImportResult:
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        self.errors = []    # (line number, message), first MAX_REPORTED_ERRORS only
+
+    def add_error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+def format_for(filename):
+    """'csv' or 'jsonl' from a file name; .json and .ndjson count as JSONL."""
+    ext = os.path.splitext(filename)[1].lower()
+    return "csv" if ext == ".csv" else "jsonl"
+
+
+def read_rows(fileobj, fmt):
+    """Yield (line number, dict or error message) for each row of a text file."""
+    if fmt == "csv":
+        reader = csv.DictReader(fileobj)
+        for row in reader:
+            yield reader.line_num, {k.strip(): v for k, v in row.items() if k}
+        return
+    for line_no, line in enumerate(fileobj, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, f"invalid JSON: {e.msg}"
+            continue
+        yield line_no, row if isinstance(row, dict) else "expected a JSON object"
+
+
+def _text(row, field, required=True):
+    value = row.get(field)
+    value = "" if value is None else str(value).strip()
+    if required and not value:
+        raise ValueError(f"missing {field}")
+    return value
+
+
+def validate_record(row):
+    """Row dict -> (record_type, detail, date) tuple; raises ValueError if invalid."""
+    record_type = _text(row, "record_type")
+    detail = _text(row, "detail")
+    try:
+        date = datetime.date.fromisoformat(_text(row, "date")[:10]).isoformat()
+    except ValueError:
+        raise ValueError(f"bad date {row.get('date')!r} (expected YYYY-MM-DD)")
+    return record_type, detail, date
+
+
+def validate_image(row):
+    """Row dict -> disease_images metadata tuple; the image file must already be in the store."""
+    name = _text(row, "name")
+    category = _text(row, "category").lower()
+    if category not in ("crop", "cattle"):
+        raise ValueError(f"bad category {category!r} (expected crop or cattle)")
+    description = _text(row, "description", required=False)
+    digest = _text(row, "image_hash").lower()
+    if not re.fullmatch(r"[0-9a-f]{64}", digest):
+        raise ValueError(f"bad image_hash {digest!r} (expected a SHA-256 hex digest)")
+    mime = _text(row, "mime_type")
+    if mime not in _EXTENSIONS:
+        raise ValueError(f"bad mime_type {mime!r} (expected one of {', '.join(sorted(_EXTENSIONS))})")
+    path = db.image_store.path_for(digest, mime)
+    # Hash and extension are safe now; this also catches symlinks leading out of the store
+    root = os.path.realpath(db.image_store.root)
+    if os.path.commonpath([root, os.path.realpath(path)]) != root:
+        raise ValueError(f"image path outside the store: {path}")
+    if not os.path.exists(path):
+        raise ValueError(f"image file not found in store: {path}")
+    return name, category, description, digest, mime, os.path.getsize(path)
+
+
+_IMPORTERS = {
+    "records": (validate_record, db.bulk_insert_records),
+    "images": (validate_image, db.bulk_insert_image_metadata),
+}
+
+
+def import_file(fileobj, fmt, kind="records", strict=False):
+    """
+    Validate and insert every row of a CSV/JSONL text stream. With strict=True
+    nothing is inserted if any row fails. Returns an ImportResult.
+    """
+    validate, bulk_insert = _IMPORTERS[kind]
+    result = ImportResult()
+    image_hashes = set()
+
+    def valid_rows():
+        for line, row in read_rows(fileobj, fmt):
+            if isinstance(row, str):
+                result.add_error(line, row)
+                continue
+            try:
+                values = validate(row)
+            except ValueError as e:
+                result.add_error(line, str(e))
+                continue
+            if kind == "images":
+                image_hashes.add(values[3])
+            yield values
+
+    if strict:
+        rows = list(valid_rows())
+        if result.failed:
+            return result
+    else:
+        rows = valid_rows()
+    result.imported = bulk_insert(rows)
+    if kind == "images" and result.imported:
+        db.backfill_thumbnails(image_hashes)
+    return result
+
+
+_EXPORTERS = {
+    "records": (RECORD_FIELDS, db.iter_records),
+    "images": (IMAGE_FIELDS, db.iter_image_metadata),
+}
+
+
+def export_chunks(kind="records", fmt="csv", chunk_size=db.EXPORT_CHUNK_SIZE):
+    """Yield the table as CSV or JSONL text, one chunk of rows at a time."""
+    fields, iter_rows = _EXPORTERS[kind]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    if writer:
+        writer.writerow(fields)
+    for rows in iter_rows(chunk_size):
+        if writer:
+            writer.writerows(rows)
+        else:
+            for row in rows:
+                buffer.write(json.dumps(dict(zip(fields, row)), ensure_ascii=False) + "\n")
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_to_file(path, kind="records", fmt=None):
+    """Stream an export to disk; returns the number of characters written."""
+    fmt = fmt or format_for(path)
+    written = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for chunk in export_chunks(kind, fmt):
+            written += f.write(chunk)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import/export of farm records and image metadata.")
+    parser.add_argument("action", choices=["import", "export"])
+    parser.add_argument("kind", choices=sorted(_IMPORTERS))
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS, default=None, help="default: from the file extension")
+    parser.add_argument("--strict", action="store_true", help="import nothing if any row is invalid")
+    args = parser.parse_args()
+    fmt = args.format or format_for(args.path)
+
+    if args.action == "export":
+        written = export_to_file(args.path, args.kind, fmt)
+        print(f"📤 Exported {args.kind} to {args.path} ({written} chars)")
+        return
+    # utf-8-sig drops the BOM spreadsheet programs put on CSV files
+    with open(args.path, encoding="utf-8-sig", newline="") as f:
+        result = import_file(f, fmt, args.kind, strict=args.strict)
+    print(f"📥 Imported {result.imported} {args.kind} row(s), {result.failed} rejected")
+    for line, message in result.errors:
+        print(f"   ⚠️ line {line}: {message}")
+    if result.failed > len(result.errors):
+        print(f"   ... and {result.failed - len(result.errors)} more")
+
+
+if __name__ == "__main__":
+    main()